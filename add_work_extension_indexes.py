@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the work extension management-page indexes
+(ix_work_ext_employee_status_filed, ix_work_ext_status_reviewed) to an existing
+database. db.create_all only creates them for new tables.
+The indexes are built CONCURRENTLY, so work extensions stay writable meanwhile.
+Usage: python add_work_extension_indexes.py <host> <port> <database> <username> <password>
+"""
+
+import sys
+from contextlib import closing
+import psycopg2
+
+def run_migration(host, port, database, username, password):
+    """Create the work extension indexes if they don't exist yet"""
+    
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction block, so each
+    # command runs on its own in autocommit mode
+    migration_commands = [
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_work_ext_employee_status_filed ON work_extensions (employee_id, status, date_filed);",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_work_ext_status_reviewed ON work_extensions (status, date_reviewed DESC);"
+    ]
+    index_names = ['ix_work_ext_employee_status_filed', 'ix_work_ext_status_reviewed']
+    
+    try:
+        # Connect to database
+        print(f"Connecting to database {database} on {host}:{port}...")
+        with closing(psycopg2.connect(
+            host=host,
+            port=port,
+            database=database,
+            user=username,
+            password=password
+        )) as conn:
+            conn.autocommit = True
+            
+            with conn.cursor() as cursor:
+                print("Running migration commands...")
+                
+                for i, command in enumerate(migration_commands, 1):
+                    print(f"Executing command {i}/{len(migration_commands)}: {command[:50]}...")
+                    try:
+                        cursor.execute(command)
+                        print(f"✓ Command {i} executed successfully")
+                    except psycopg2.Error as e:
+                        print(f"✗ Error in command {i}: {e}")
+                        raise
+                
+                # Verify the change - a failed concurrent build leaves an INVALID
+                # index behind; drop it and rerun the script
+                print("\nVerifying migration...")
+                cursor.execute("""
+                    SELECT c.relname
+                    FROM pg_index i
+                    JOIN pg_class c ON c.oid = i.indexrelid
+                    WHERE c.relname = ANY(%s) AND i.indisvalid
+                """, (index_names,))
+                
+                valid = {row[0] for row in cursor.fetchall()}
+                missing = [name for name in index_names if name not in valid]
+                if not missing:
+                    print("✓ Migration successful: work extension indexes are in place")
+                else:
+                    print(f"✗ Migration verification failed: missing or invalid {', '.join(missing)}")
+                    return False
+        
+        print("\nMigration completed successfully!")
+        return True
+    
+    except psycopg2.Error as e:
+        print(f"Database error: {e}")
+        return False
+    except Exception as e:
+        print(f"Unexpected error: {e}")
+        return False
+
+if __name__ == "__main__":
+    if len(sys.argv) != 6:
+        print("Usage: python add_work_extension_indexes.py <host> <port> <database> <username> <password>")
+        print("Example: python add_work_extension_indexes.py db 5432 scheduling_db postgres postgres")
+        sys.exit(1)
+    
+    host = sys.argv[1]
+    port = sys.argv[2]
+    database = sys.argv[3]
+    username = sys.argv[4]
+    password = sys.argv[5]
+    
+    success = run_migration(host, port, database, username, password)
+    sys.exit(0 if success else 1)
@@ -2,24 +2,38 @@ from flask import Flask, session, request, redirect, url_for
 from flask_login import LoginManager, current_user
 from flask_migrate import Migrate
 from flask_mail import Mail
+from flask_caching import Cache
 from app.models import db, User, UserRole
 
 # Initialize extensions
 migrate = Migrate()
 login_manager = LoginManager()
 mail = Mail()
+cache = Cache()
 
-def create_app(config_name='default'):
-    from config import config
+def create_app(config_name=None):
+    from config import get_config
     
     app = Flask(__name__)
-    app.config.from_object(config[config_name])
+    config_class = get_config(config_name)
+    app.config.from_object(config_class)
+    
+    # Secrets are read here rather than at import so late-injected
+    # environment values and mounted secret files are picked up
+    app.config['SECRET_KEY'] = config_class.secret_key(app.instance_path)
+    app.config['SQLALCHEMY_DATABASE_URI'] = config_class.database_url()
+    if not app.config['SECRET_KEY'] or not app.config['SQLALCHEMY_DATABASE_URI']:
+        raise RuntimeError('SECRET_KEY and DATABASE_URL must be set (environment or secrets file)')
     
     # Initialize extensions with app
     db.init_app(app)
     migrate.init_app(app, db)
     login_manager.init_app(app)
     mail.init_app(app)
+    cache.init_app(app)
+    
+    from app.utils.cache import register_cache_invalidation
+    register_cache_invalidation()
     
     # Login manager configuration
     login_manager.login_view = 'auth.login'
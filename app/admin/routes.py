@@ -2,6 +2,7 @@ from flask import render_template, request, redirect, url_for, flash, jsonify, c
 from flask_login import login_required, current_user
 from app.admin import bp
 from app.models import AppSettings, User, Section, Unit, UserRole, db, EmailSettings, EmployeeType, ScheduleFormat, TwoFactorSettings, UserTwoFactor, TrustedDevice, TwoFactorStatus, TwoFactorMethod
+from app.utils.scope import scoped_user_query
 import secrets
 
 
@@ -2866,12 +2867,7 @@ def export_data():
     total_units = Unit.query.count()
     
     # Get team members based on user's scope
-    if current_user.section_id:
-        team_members = User.query.filter_by(section_id=current_user.section_id, is_active=True).all()
-    elif current_user.unit_id:
-        team_members = User.query.filter_by(unit_id=current_user.unit_id, is_active=True).all()
-    else:
-        team_members = User.query.filter_by(is_active=True).all()
+    team_members = scoped_user_query(current_user).all()
     
     stats = {
         'total_users': total_users,
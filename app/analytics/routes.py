@@ -155,8 +155,8 @@ def get_work_extension_data():
         return jsonify({'success': False, 'error': 'Start and end dates are required'}), 400
     
     try:
-        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-        end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+        start_date = date.fromisoformat(start_date)
+        end_date = date.fromisoformat(end_date)
     except ValueError:
         return jsonify({'success': False, 'error': 'Invalid date format'}), 400
     
@@ -196,8 +196,8 @@ def get_overtime_data():
         return jsonify({'success': False, 'error': 'Start and end dates are required'}), 400
     
     try:
-        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-        end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+        start_date = date.fromisoformat(start_date)
+        end_date = date.fromisoformat(end_date)
     except ValueError:
         return jsonify({'success': False, 'error': 'Invalid date format'}), 400
     
@@ -602,8 +602,8 @@ def export_work_extension_data():
         return jsonify({'success': False, 'error': 'Start and end dates are required'}), 400
     
     try:
-        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-        end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+        start_date = date.fromisoformat(start_date)
+        end_date = date.fromisoformat(end_date)
     except ValueError:
         return jsonify({'success': False, 'error': 'Invalid date format'}), 400
     
@@ -680,8 +680,8 @@ def export_overtime_data():
         return jsonify({'success': False, 'error': 'Start and end dates are required'}), 400
     
     try:
-        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-        end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+        start_date = date.fromisoformat(start_date)
+        end_date = date.fromisoformat(end_date)
     except ValueError:
         return jsonify({'success': False, 'error': 'Invalid date format'}), 400
     
@@ -1088,8 +1088,8 @@ def get_summary_report():
         return jsonify({'success': False, 'error': 'Start and end dates are required'}), 400
     
     try:
-        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-        end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+        start_date = date.fromisoformat(start_date)
+        end_date = date.fromisoformat(end_date)
     except ValueError:
         return jsonify({'success': False, 'error': 'Invalid date format'}), 400
     
@@ -9,7 +9,7 @@ from app.utils.email_service import EmailService
 from datetime import datetime, date, timedelta
 import os
 from werkzeug.utils import secure_filename
-import pdfkit
+from app.utils.pdf import render_pdf
 
 def get_user_approver(user):
     """Get the designated approver for a user based on their section/unit"""
@@ -425,11 +425,11 @@ def submit_leave():
         
         # Send email notification to approver
         try:
-            email_sent = EmailService.send_leave_request_notification(leave_app)
-            if email_sent:
-                flash(f'Leave application {leave_app.reference_code} submitted successfully! Approver has been notified by email.', 'success')
+            email_queued = EmailService.send_leave_request_notification(leave_app)
+            if email_queued:
+                flash(f'Leave application {leave_app.reference_code} submitted successfully! An email notification to the approver has been queued.', 'success')
             else:
-                flash(f'Leave application {leave_app.reference_code} submitted successfully! (Email notification could not be sent)', 'warning')
+                flash(f'Leave application {leave_app.reference_code} submitted successfully! (Email notification was not sent)', 'warning')
         except Exception as e:
             print(f"Email notification error: {str(e)}")
             flash(f'Leave application {leave_app.reference_code} submitted successfully! (Email notification failed)', 'warning')
@@ -736,26 +736,26 @@ def create_leave_shifts(leave_application):
         raise e
 
 # WKHTMLTOPDF FUNCTIONS
+# wkhtmltopdf options (A5 landscape) - built once rather than on every render
+LEAVE_PDF_OPTIONS = {
+    'page-size': 'A5',
+    'orientation': 'Landscape',
+    'margin-top': '0.01in',
+    'margin-right': '0.1in', 
+    'margin-bottom': '0.01in',
+    'margin-left': '0.1in',
+    'encoding': "UTF-8",
+    'no-outline': None,
+    'enable-local-file-access': None,
+    'disable-smart-shrinking': None,
+    'print-media-type': None,
+    'quiet': None
+}
+
 def html_to_pdf(html_content):
     """Convert HTML content to PDF using wkhtmltopdf in A5 Landscape"""
     try:
-        options = {
-            'page-size': 'A5',
-            'orientation': 'Landscape',
-            'margin-top': '0.01in',
-            'margin-right': '0.1in', 
-            'margin-bottom': '0.01in',
-            'margin-left': '0.1in',
-            'encoding': "UTF-8",
-            'no-outline': None,
-            'enable-local-file-access': None,
-            'disable-smart-shrinking': None,
-            'print-media-type': None,
-            'quiet': None
-        }
-        
-        return pdfkit.from_string(html_content, False, options=options)
-        
+        return render_pdf(html_content, LEAVE_PDF_OPTIONS)
     except Exception as e:
         print(f"Error converting HTML to PDF: {str(e)}")
         raise e
@@ -1,7 +1,7 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime, date, timedelta, timezone
+from datetime import datetime, date, time, timedelta, timezone
 from enum import Enum
 import uuid
 import json
@@ -274,6 +274,19 @@ class User(UserMixin, db.Model):
             
         return False
     
+    @classmethod
+    def can_approve_leaves_criteria(cls):
+        """SQL counterpart of can_approve_leaves, for validating an approver inside the lookup query"""
+        return db.or_(
+            db.and_(cls.role == UserRole.ADMINISTRATOR, cls.email == 'post_it@gmanetwork.com'),
+            cls.is_section_approver == True,
+            cls.is_unit_approver == True,
+            db.and_(
+                cls.role.in_([UserRole.MANAGER, UserRole.ADMINISTRATOR]),
+                db.or_(cls.section_id != None, cls.unit_id != None)
+            )
+        )
+    
 
     def get_approvable_employees(self):
         """FIXED: Get list of employees whose leave this user can approve - Section/Unit Restricted"""
@@ -866,76 +879,50 @@ class User(UserMixin, db.Model):
     
     def get_approvable_employees(self):
         """UPDATED: Get list of employees whose leave this user can approve with 4-level hierarchy"""
+        return User.query.filter(self.approvable_employees_filter()).all()
+    
+    def approvable_employees_filter(self):
+        """SQL criterion matching the users returned by get_approvable_employees
+        
+        Lets callers combine the approval scope with their own filters (or use it
+        as a subquery) in one statement instead of hydrating every employee.
+        """
         if self.can_admin():
             # Administrators can approve for all active employees
-            return User.query.filter_by(is_active=True).all()
+            return User.is_active == True
         
-        employees = set()  # Use set to avoid duplicates
+        scopes = []
         
         # Department approvers can approve for all employees in the same department
         if self.is_department_approver and self.department_id:
-            dept_employees = User.query.filter_by(
-                department_id=self.department_id, 
-                is_active=True
-            ).all()
-            employees.update(dept_employees)
+            scopes.append(User.department_id == self.department_id)
         
         # Division approvers can approve for employees in the same division
         if self.is_division_approver and self.division_id:
-            div_employees = User.query.filter_by(
-                division_id=self.division_id, 
-                is_active=True
-            ).all()
-            employees.update(div_employees)
+            scopes.append(User.division_id == self.division_id)
         
         # Section approvers can approve for all employees in the same section
         if self.is_section_approver and self.section_id:
-            section_employees = User.query.filter_by(
-                section_id=self.section_id, 
-                is_active=True
-            ).all()
-            employees.update(section_employees)
+            scopes.append(User.section_id == self.section_id)
         
         # Unit approvers can approve for employees in the same unit
         if self.is_unit_approver and self.unit_id:
-            unit_employees = User.query.filter_by(
-                unit_id=self.unit_id, 
-                is_active=True
-            ).all()
-            employees.update(unit_employees)
+            scopes.append(User.unit_id == self.unit_id)
         
-        # Managers can approve for employees in their organizational scope
+        # Managers can approve for employees in their (broadest) organizational scope
         if self.role == UserRole.MANAGER:
-            # Department managers can approve for entire department
             if self.department_id:
-                manager_dept_employees = User.query.filter_by(
-                    department_id=self.department_id,
-                    is_active=True
-                ).all()
-                employees.update(manager_dept_employees)
-            # Division managers can approve for entire division
+                scopes.append(User.department_id == self.department_id)
             elif self.division_id:
-                manager_div_employees = User.query.filter_by(
-                    division_id=self.division_id,
-                    is_active=True
-                ).all()
-                employees.update(manager_div_employees)
-            # Section managers can approve for entire section
+                scopes.append(User.division_id == self.division_id)
             elif self.section_id:
-                manager_section_employees = User.query.filter_by(
-                    section_id=self.section_id,
-                    is_active=True
-                ).all()
-                employees.update(manager_section_employees)
-            # Unit managers can approve for unit
+                scopes.append(User.section_id == self.section_id)
             elif self.unit_id:
-                manager_unit_employees = User.query.filter_by(
-                    unit_id=self.unit_id,
-                    is_active=True
-                ).all()
-                employees.update(manager_unit_employees)
+                scopes.append(User.unit_id == self.unit_id)
         
-        return list(employees)
+        if not scopes:
+            return db.false()
+        return db.and_(User.is_active == True, db.or_(*scopes))
     
     @property
     def full_name(self):
@@ -985,9 +972,12 @@ class User(UserMixin, db.Model):
     def can_edit_schedule(self):
         return self.role in [UserRole.MANAGER, UserRole.ADMINISTRATOR]
     
+    # Employee types allowed to file work extensions
+    WORK_EXTENSION_EMPLOYEE_TYPES = (EmployeeType.CONFIDENTIAL, EmployeeType.CONFIDENTIAL_PROBATIONARY)
+    
     def can_file_work_extension(self):
         """Check if user can file work extensions (confidential employees only)"""
-        return (self.employee_type in [EmployeeType.CONFIDENTIAL, EmployeeType.CONFIDENTIAL_PROBATIONARY] 
+        return (self.employee_type in self.WORK_EXTENSION_EMPLOYEE_TYPES
                 and self.is_active)
 
     def is_global_admin(self):
@@ -1068,7 +1058,8 @@ class Shift(db.Model):
     
     __table_args__ = (
         db.Index('idx_shifts_date_employee', 'date', 'employee_id'),
-        db.Index('idx_shifts_employee_date_sequence', 'employee_id', 'date', 'sequence'),
+        # Unique index also serves (employee_id, date, sequence) lookups and ordering
+        db.UniqueConstraint('employee_id', 'date', 'sequence', name='uq_shift_emp_date_seq'),
     )
     
     @property
@@ -1370,6 +1361,14 @@ class DateRemark(db.Model):
     
     created_by = db.relationship('User', backref='date_remarks_created')
     
+    # CSS badge class per remark type
+    BADGE_CLASSES = {
+        DateRemarkType.HOLIDAY: 'badge-danger',
+        DateRemarkType.SPECIAL_DAY: 'badge-info',
+        DateRemarkType.NOTICE: 'badge-warning',
+        DateRemarkType.OTHER: 'badge-secondary'
+    }
+    
     def __repr__(self):
         return f'<DateRemark {self.date}: {self.title}>'
     
@@ -1381,13 +1380,7 @@ class DateRemark(db.Model):
     @property
     def badge_class(self):
         """Get CSS class for badge display"""
-        type_classes = {
-            DateRemarkType.HOLIDAY: 'badge-danger',
-            DateRemarkType.SPECIAL_DAY: 'badge-info',
-            DateRemarkType.NOTICE: 'badge-warning',
-            DateRemarkType.OTHER: 'badge-secondary'
-        }
-        return type_classes.get(self.remark_type, 'badge-secondary')
+        return self.BADGE_CLASSES.get(self.remark_type, 'badge-secondary')
     
     @classmethod
     def get_remarks_for_period(cls, start_date, end_date):
@@ -1620,6 +1613,12 @@ class WorkExtension(db.Model):
     employee = db.relationship('User', foreign_keys=[employee_id], backref='work_extensions')
     approver = db.relationship('User', foreign_keys=[approver_id], backref='approved_work_extensions')
     
+    __table_args__ = (
+        # Management page: pending per employee oldest-first, recent decisions newest-first
+        db.Index('ix_work_ext_employee_status_filed', 'employee_id', 'status', 'date_filed'),
+        db.Index('ix_work_ext_status_reviewed', status, date_reviewed.desc()),
+    )
+    
     @staticmethod
     def generate_reference_code():
         """Generate unique reference code for work extension"""
@@ -2592,10 +2591,17 @@ class ScheduleTemplateV2(db.Model):
             
             for shift in existing_shifts:
                 db.session.delete(shift)
+            
+            # Flush deletes first - the unit of work would otherwise INSERT the replacements
+            # before the DELETEs and trip uq_shift_emp_date_seq
+            db.session.flush()
         
         # FIXED: Create new shifts from template with better validation
         created_shifts = []
         skipped_shifts = []
+        # (employee, date, sequence) keys created in this run - two template employees
+        # mapped to the same target would otherwise trip uq_shift_emp_date_seq
+        created_keys = set()
         
         for shift_data in self.template_data['shifts']:
             # FIXED: Handle both string and integer employee IDs from template
@@ -2614,6 +2620,14 @@ class ScheduleTemplateV2(db.Model):
                 skipped_shifts.append(f"Invalid shift date {shift_date} outside target range")
                 continue
             
+            shift_key = (target_employee_id, shift_date, shift_data.get('sequence'))
+            if shift_key in created_keys:
+                skipped_shifts.append(
+                    f"Duplicate shift for target employee ID {target_employee_id} on {shift_date} "
+                    f"(sequence {shift_data.get('sequence')}) - already created from another template employee"
+                )
+                continue
+            
             # Check if shift already exists (if not replacing)
             if not replace_existing:
                 existing = Shift.query.filter_by(
@@ -2633,8 +2647,8 @@ class ScheduleTemplateV2(db.Model):
                 new_shift = Shift(
                     employee_id=target_employee_id,
                     date=shift_date,
-                    start_time=datetime.strptime(shift_data['start_time'], '%H:%M').time() if shift_data['start_time'] else None,
-                    end_time=datetime.strptime(shift_data['end_time'], '%H:%M').time() if shift_data['end_time'] else None,
+                    start_time=time.fromisoformat(shift_data['start_time']) if shift_data['start_time'] else None,
+                    end_time=time.fromisoformat(shift_data['end_time']) if shift_data['end_time'] else None,
                     role=shift_data['role'],
                     status=ShiftStatus(shift_data['status']),
                     notes=shift_data['notes'],
@@ -2645,6 +2659,7 @@ class ScheduleTemplateV2(db.Model):
                 
                 db.session.add(new_shift)
                 created_shifts.append(new_shift)
+                created_keys.add(shift_key)
                 
             except (ValueError, KeyError) as e:
                 skipped_shifts.append(f"Invalid shift data: {str(e)}")
@@ -2832,4 +2847,60 @@ class ScheduleTemplateV2(db.Model):
     @property
     def is_blank_template(self):
         """Check if this is a blank template"""
-        return self.template_type == TemplateType.BLANK
\ No newline at end of file
+        return self.template_type == TemplateType.BLANK
+
+class TemplateApplyJob(db.Model):
+    """Background template application job - lets the apply route return immediately"""
+    __tablename__ = 'template_apply_jobs'
+    
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+    
+    # Jobs run in-process, so one still unfinished after this long was lost
+    # with its gunicorn worker and will never complete
+    STALE_AFTER = timedelta(minutes=30)
+    
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    template_id = db.Column(db.Integer, db.ForeignKey('schedule_templates_v2.id', ondelete='CASCADE'), nullable=False)
+    requested_by_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    status = db.Column(db.String(20), default=QUEUED, nullable=False)
+    params = db.Column(db.JSON, nullable=False)
+    result = db.Column(db.JSON, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    completed_at = db.Column(db.DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f'<TemplateApplyJob {self.id} {self.status}>'
+    
+    @property
+    def is_finished(self):
+        return self.status in (self.COMPLETED, self.FAILED)
+    
+    @classmethod
+    def fail_stale_jobs(cls):
+        """Mark QUEUED/RUNNING jobs older than STALE_AFTER as FAILED (caller commits)"""
+        now = datetime.utcnow()
+        return cls.query.filter(
+            cls.status.in_((cls.QUEUED, cls.RUNNING)),
+            cls.created_at < now - cls.STALE_AFTER
+        ).update({
+            cls.status: cls.FAILED,
+            cls.error: 'Template application was interrupted (server restarted). Please apply the template again.',
+            cls.completed_at: now
+        }, synchronize_session=False)
+    
+    def to_dict(self):
+        """Convert job to dictionary for JSON responses"""
+        return {
+            'job_id': self.id,
+            'template_id': self.template_id,
+            'status': self.status,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None
+        }
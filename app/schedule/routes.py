@@ -3,15 +3,201 @@
 # Added Export Worksched function for managers
 # =============================================================================
 
-from flask import render_template, request, jsonify, redirect, url_for, flash, make_response
+from flask import (render_template, request, jsonify, redirect, url_for, flash, make_response,
+                   Response, stream_with_context, g, session, current_app)
 from flask_login import login_required, current_user
 from app.schedule import bp
 from app.models import (User, Shift, Section, Unit, ShiftStatus, WorkArrangement, db, 
-                       DateRemark, DateRemarkType, ScheduleFormat, EmployeeType, ScheduleTemplateV2, TemplateType)  
+                       DateRemark, DateRemarkType, ScheduleFormat, EmployeeType, ScheduleTemplateV2, TemplateType,
+                       TemplateApplyJob)
+from app import cache
+from app.utils.background import submit_to
+from app.utils.cache import org_scope_cache_key, is_cacheable_response, ORG_SCOPE_VERSION_KEY
+from app.utils.formatting import fmt_time, parse_hhmm
+from app.utils.scope import scoped_user_query
+from sqlalchemy import select, union_all, literal, literal_column, cast, null, Integer
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import load_only, joinedload, raiseload
 from datetime import datetime, date, timedelta, time
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
+from operator import attrgetter
 import calendar
 import csv
+import functools
+import hashlib
 import io
+import orjson
+import zlib
+
+# Shift statuses exported as a single leave row in the worksched export
+LEAVE_STATUSES = frozenset({
+    ShiftStatus.SICK_LEAVE, ShiftStatus.PERSONAL_LEAVE, 
+    ShiftStatus.EMERGENCY_LEAVE, ShiftStatus.ANNUAL_VACATION,
+    ShiftStatus.HOLIDAY_OFF, ShiftStatus.BEREAVEMENT_LEAVE,
+    ShiftStatus.PATERNITY_LEAVE, ShiftStatus.MATERNITY_LEAVE,
+    ShiftStatus.UNION_LEAVE, ShiftStatus.FIRE_CALAMITY_LEAVE,
+    ShiftStatus.SOLO_PARENT_LEAVE, ShiftStatus.SPECIAL_LEAVE_WOMEN,
+    ShiftStatus.VAWC_LEAVE, ShiftStatus.OTHER, ShiftStatus.OFFSET
+})
+
+# Enum lookups by stored value - plain dict gets instead of Enum.__call__
+_STATUS_BY_VALUE = {status.value: status for status in ShiftStatus}
+_ARR_BY_VALUE = {arrangement.value: arrangement for arrangement in WorkArrangement}
+
+# Template applications get their own threads so a burst of them can't hold up
+# the emails and PDF renders queued on the shared background pool
+_template_apply_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='template-apply')
+
+def _schedule_etag(view_type, start_date, end_date, member_ids, member_ids_q):
+    """ETag for a rendered view_schedule page.
+    
+    Covers the viewer, the date range, the roster and a fingerprint of its users
+    and shifts (newest updated_at plus row count, so deletes are caught too),
+    the org structure version (unit/section names) and the build id, so a
+    deploy with changed markup invalidates old ETags.
+    """
+    shift_scope = (Shift.date.between(start_date, end_date), Shift.employee_id.in_(member_ids_q))
+    fingerprint = db.session.execute(select(
+        select(db.func.max(Shift.updated_at)).where(*shift_scope).scalar_subquery(),
+        select(db.func.count(Shift.id)).where(*shift_scope).scalar_subquery(),
+        select(db.func.max(User.updated_at)).where(User.id.in_(member_ids_q)).scalar_subquery()
+    )).one()
+    
+    parts = (
+        current_user.id, current_user.updated_at, _can_edit(), view_type, start_date, end_date,
+        date.today(), tuple(sorted(member_ids)), tuple(fingerprint),
+        cache.get(ORG_SCOPE_VERSION_KEY) or 0, current_app.config['BUILD_ID']
+    )
+    return hashlib.md5(repr(parts).encode('utf-8')).hexdigest()
+
+def _arr_value(shift):
+    """Work arrangement value for JSON payloads - shifts without one count as onsite"""
+    return shift.work_arrangement.value if shift.work_arrangement else 'onsite'
+
+# Preset holidays for the Philippines - expand this or make it configurable
+PRESET_HOLIDAYS = (
+    {'title': 'New Year\'s Day', 'month': 1, 'day': 1},
+    {'title': 'Maundy Thursday', 'month': 3, 'day': 28},  # Example date - varies yearly
+    {'title': 'Good Friday', 'month': 3, 'day': 29},      # Example date - varies yearly
+    {'title': 'Araw ng Kagitingan', 'month': 4, 'day': 9},
+    {'title': 'Labor Day', 'month': 5, 'day': 1},
+    {'title': 'Independence Day', 'month': 6, 'day': 12},
+    {'title': 'National Heroes Day', 'month': 8, 'day': 26},  # Last Monday of August
+    {'title': 'All Saints\' Day', 'month': 11, 'day': 1},
+    {'title': 'Bonifacio Day', 'month': 11, 'day': 30},
+    {'title': 'Christmas Day', 'month': 12, 'day': 25},
+    {'title': 'Rizal Day', 'month': 12, 'day': 30},
+    {'title': 'New Year\'s Eve', 'month': 12, 'day': 31}
+)
+
+class _Echo:
+    """File-like object for csv.writer that hands each written row back to the caller"""
+    def write(self, value):
+        return value
+
+def _gzip_stream(chunks):
+    """Gzip-compress a stream of text chunks on the fly"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+# Column order of the tuple returned by _worksched_times
+_WORKSCHED_TIME_KEYS = ('start_time', 'end_time', 'break_1hr_start', 'break_1hr_end',
+                        'break_30min_start', 'break_30min_end')
+
+@functools.lru_cache(maxsize=2048)
+def _worksched_times(start_time, nine_hour):
+    """Standard work and break columns (HH:MM strings) for a shift starting at start_time
+    
+    Only depends on the start time and schedule format, so each distinct pair is
+    computed once instead of per shift row.
+    """
+    start_datetime = datetime.combine(date.today(), start_time)
+    end_datetime = start_datetime + timedelta(hours=9 if nine_hour else 8)
+    break_start_datetime = start_datetime + timedelta(hours=3)
+    break_end_datetime = break_start_datetime + timedelta(minutes=60 if nine_hour else 30)
+    
+    work_start = start_datetime.strftime('%H:%M')
+    work_end = end_datetime.strftime('%H:%M')
+    break_start = break_start_datetime.strftime('%H:%M')
+    break_end = break_end_datetime.strftime('%H:%M')
+    
+    if nine_hour:
+        return (work_start, work_end, break_start, break_end, '', '')
+    return (work_start, work_end, '', '', break_start, break_end)
+
+@functools.lru_cache(maxsize=4096)
+def _worksched_shift_columns(start_time, qualifies_for_break, nine_hour):
+    """DWS, work, break and remarks columns of a regular worksched row
+    
+    DWS and remarks are blank; work times are the standard 8/9-hour window from
+    the start time, and break columns are only filled when the shift qualifies
+    for a break (Shift.qualifies_for_break).
+    """
+    if not start_time:
+        return ('', '', '', '', '', '', '', '')
+    
+    times = _worksched_times(start_time, nine_hour)
+    breaks = times[2:] if qualifies_for_break else ('', '', '', '')
+    return ('', times[0], times[1], *breaks, '')
+
+def _csv_response(rows, filename):
+    """Stream CSV rows as a download, gzip-encoded when the client accepts it"""
+    headers = {
+        'Content-Disposition': f'attachment; filename={filename}',
+        'Vary': 'Accept-Encoding'
+    }
+    if 'gzip' in request.accept_encodings:
+        rows = _gzip_stream(rows)
+        headers['Content-Encoding'] = 'gzip'
+    return Response(stream_with_context(rows), mimetype='text/csv', headers=headers)
+
+def _can_edit():
+    """Whether the current user can edit schedules, evaluated once per request"""
+    if not hasattr(g, '_can_edit'):
+        g._can_edit = current_user.can_edit_schedule()
+    return g._can_edit
+
+def _next_shift_sequence(employee_id, shift_date):
+    """Scalar subquery for the next free shift sequence, evaluated inside the INSERT"""
+    return select(
+        db.func.coalesce(db.func.max(Shift.sequence), 0) + 1
+    ).where(
+        Shift.employee_id == employee_id,
+        Shift.date == shift_date
+    ).scalar_subquery()
+
+# Lightweight, render-only view of a Shift for the schedule grid
+_ShiftCell = namedtuple('_ShiftCell', [
+    'id', 'color', 'time_display', 'role', 'status_value', 'status_title',
+    'arrangement_value', 'sequence'
+])
+
+@functools.lru_cache(maxsize=4096)
+def _time_range_display(start_time, end_time):
+    """Same text as Shift.time_display, formatted once per distinct (start, end) pair"""
+    if start_time and end_time:
+        return f"{start_time.strftime('%I:%M%p').lower()}-{end_time.strftime('%I:%M%p').lower()}"
+    return "No time set"
+
+def _shift_cell(shift):
+    """Build the grid view-model for a shift"""
+    status_value = shift.status.value
+    return _ShiftCell(
+        id=shift.id,
+        color=shift.color or shift.status_color,
+        time_display=_time_range_display(shift.start_time, shift.end_time),
+        role=shift.role,
+        status_value=status_value,
+        status_title=status_value.replace('_', ' ').title(),
+        arrangement_value=shift.work_arrangement.value if shift.work_arrangement else None,
+        sequence=shift.sequence
+    )
 
 @bp.route('/')
 @bp.route('/view')
@@ -20,7 +206,7 @@ def view_schedule():
     # Get date range from request or default to current week
     view_type = request.args.get('view', 'week')
     date_str = request.args.get('date', date.today().isoformat())
-    selected_date = datetime.strptime(date_str, '%Y-%m-%d').date()
+    selected_date = date.fromisoformat(date_str)
     
     if view_type == 'week':
         start_date = selected_date - timedelta(days=selected_date.weekday())
@@ -36,24 +222,23 @@ def view_schedule():
         dates = [selected_date]
     
     # UPDATED: Get team members based on user role and permissions
-    if current_user.can_edit_schedule():
-        # Managers and Admins see their organizational scope
-        if current_user.section_id:
-            team_members = User.query.filter_by(section_id=current_user.section_id, is_active=True).all()
-        elif current_user.unit_id:
-            team_members = User.query.filter_by(unit_id=current_user.unit_id, is_active=True).all()
-        else:
-            team_members = User.query.filter_by(is_active=True).all()
-    else:
-        # UPDATED: Regular employees can see their entire section
-        if current_user.section_id:
-            team_members = User.query.filter_by(section_id=current_user.section_id, is_active=True).all()
-        elif current_user.unit_id:
-            # If employee has unit but no section, show unit members
-            team_members = User.query.filter_by(unit_id=current_user.unit_id, is_active=True).all()
-        else:
-            # Fallback: show only current user if no organizational assignment
-            team_members = [current_user]
+    # Section, else unit, else everyone (managers/admins) or just the user (employees).
+    # Shift queries filter on the roster as an IN (SELECT ...) so membership is always live
+    member_ids_q = scoped_user_query(current_user).with_entities(User.id)
+    
+    # Conditional GET: the roster ids plus a cheap fingerprint query stand in for
+    # loading the team members, hydrating the shifts and rendering the grid
+    member_ids = [row.id for row in member_ids_q]
+    etag = _schedule_etag(view_type, start_date, end_date, member_ids, member_ids_q)
+    if etag in request.if_none_match and not session.get('_flashes'):
+        response = make_response('', 304)
+        response.set_etag(etag)
+        return response
+    
+    # Unit/section are read by the sort key and the employee cell - join them in up front
+    team_members = scoped_user_query(current_user).options(
+        joinedload(User.unit), joinedload(User.section)
+    ).all()
     
     # UPDATED: Sort team members by Unit name (if exists), then by last name
     def sort_key(member):
@@ -64,25 +249,29 @@ def view_schedule():
     team_members = sorted(team_members, key=sort_key)
     
     # Get shifts for the date range and team members - ORDER BY sequence
-    shifts = Shift.query.filter(
+    # Only the columns the grid renders are loaded (notes are fetched by the edit modal).
+    # raiseload('*') turns any accidental relationship lazy-load into an error instead of an N+1
+    shifts = Shift.query.options(load_only(
+        Shift.id, Shift.employee_id, Shift.date, Shift.start_time, Shift.end_time,
+        Shift.role, Shift.status, Shift.color, Shift.sequence, Shift.work_arrangement
+    ), raiseload('*')).filter(
         Shift.date.between(start_date, end_date),
-        Shift.employee_id.in_([tm.id for tm in team_members])
+        Shift.employee_id.in_(member_ids_q)
     ).order_by(Shift.employee_id, Shift.date, Shift.sequence).all()
     
     # TEMPORARY: Empty date remarks until DateRemark model is implemented
     date_remarks_dict = {}
     
-    # UPDATED: Organize shifts by employee and date - SUPPORT MULTIPLE SHIFTS
-    schedule_grid = {}
-    for member in team_members:
-        schedule_grid[member.id] = {}
-        for d in dates:
-            schedule_grid[member.id][d.isoformat()] = []  # Changed to list for multiple shifts
-    
-    for shift in shifts:
-        schedule_grid[shift.employee_id][shift.date.isoformat()].append(shift)
+    # UPDATED: Organize shifts by (employee, ISO date) - SUPPORT MULTIPLE SHIFTS
+    # Shifts arrive ordered by (employee_id, date, sequence), so each cell is one contiguous run.
+    # Only cells that have shifts get an entry; the template falls back to an empty list.
+    # Cells hold precomputed view-models, so the template does no formatting or lazy loads
+    schedule_grid = {
+        (employee_id, shift_date.isoformat()): [_shift_cell(shift) for shift in group]
+        for (employee_id, shift_date), group in groupby(shifts, key=attrgetter('employee_id', 'date'))
+    }
     
-    return render_template('schedule/view.html',
+    response = make_response(render_template('schedule/view.html',
                          team_members=team_members,
                          dates=dates,
                          schedule_grid=schedule_grid,
@@ -90,7 +279,11 @@ def view_schedule():
                          view_type=view_type,
                          selected_date=selected_date,
                          today=date.today(),
-                         can_edit=current_user.can_edit_schedule())
+                         can_edit=_can_edit()))
+    response.set_etag(etag)
+    # Browsers must revalidate every time; unchanged grids come back as an empty 304
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
 
 
 @bp.route('/api/shift/<int:shift_id>')
@@ -105,7 +298,7 @@ def get_shift(shift_id):
         # UPDATED: Check permissions - allow viewing section schedules
         can_view = False
         
-        if current_user.can_edit_schedule():
+        if _can_edit():
             can_view = True
         elif shift.employee_id == current_user.id:
             can_view = True
@@ -125,14 +318,13 @@ def get_shift(shift_id):
                 'id': shift.id,
                 'employee_id': shift.employee_id,
                 'date': shift.date.isoformat(),
-                'start_time': shift.start_time.strftime('%H:%M') if shift.start_time else '',
-                'end_time': shift.end_time.strftime('%H:%M') if shift.end_time else '',
+                'start_time': fmt_time(shift.start_time),
+                'end_time': fmt_time(shift.end_time),
                 'role': shift.role or '',
                 'status': shift.status.value,
                 'notes': shift.notes or '',
                 'color': shift.color or '#007bff',
-                'work_arrangement': shift.work_arrangement.value if shift.work_arrangement else 'onsite',
-                'work_arrangement': shift.work_arrangement.value if shift.work_arrangement else 'onsite'
+                'work_arrangement': _arr_value(shift)
             }
         })
     except Exception as e:
@@ -147,7 +339,7 @@ def create_or_update_shift():
         
         # UPDATED: Validate permissions for editing (not just viewing)
         employee_id = int(data.get('employee_id'))
-        if not current_user.can_edit_schedule() and employee_id != current_user.id:
+        if not _can_edit() and employee_id != current_user.id:
             return jsonify({'success': False, 'error': 'Insufficient permissions'}), 403
         
         shift_id = data.get('shift_id')
@@ -160,33 +352,36 @@ def create_or_update_shift():
             shift.employee_id = employee_id
             
             # NEW: Auto-assign sequence number for new shifts
-            shift_date = datetime.strptime(data['date'], '%Y-%m-%d').date()
-            existing_shifts = Shift.query.filter_by(
-                employee_id=employee_id, 
-                date=shift_date
-            ).order_by(Shift.sequence.desc()).first()
-            
-            shift.sequence = (existing_shifts.sequence + 1) if existing_shifts else 1
+            # UPDATED: Computed inside the INSERT as a scalar subquery (no pre-SELECT round trip)
+            shift_date = date.fromisoformat(data['date'])
+            shift.sequence = _next_shift_sequence(employee_id, shift_date)
+        
+        status = _STATUS_BY_VALUE.get(data.get('status', 'scheduled'))
+        if status is None:
+            return jsonify({'success': False, 'error': f"Invalid status: {data.get('status')}"}), 400
+        work_arrangement = _ARR_BY_VALUE.get(data.get('work_arrangement') or 'onsite')
+        if work_arrangement is None and status != ShiftStatus.REST_DAY:
+            return jsonify({'success': False, 'error': f"Invalid work arrangement: {data.get('work_arrangement')}"}), 400
         
         # Update shift data
-        shift.date = datetime.strptime(data['date'], '%Y-%m-%d').date()
-        shift.status = ShiftStatus(data.get('status', 'scheduled'))
+        shift.date = date.fromisoformat(data['date'])
+        shift.status = status
         
         # FIXED: Handle time fields conditionally based on status
         if shift.status == ShiftStatus.SCHEDULED:
             # For scheduled shifts, require time fields
             if data.get('start_time') and data['start_time'].strip():
-                shift.start_time = datetime.strptime(data['start_time'], '%H:%M').time()
+                shift.start_time = parse_hhmm(data['start_time'])
             else:
                 shift.start_time = None
                 
             if data.get('end_time') and data['end_time'].strip():
-                shift.end_time = datetime.strptime(data['end_time'], '%H:%M').time()
+                shift.end_time = parse_hhmm(data['end_time'])
             else:
                 shift.end_time = None
                 
             shift.role = data.get('role', '') or None
-            shift.work_arrangement = WorkArrangement(data.get('work_arrangement', 'onsite'))
+            shift.work_arrangement = work_arrangement
             
         elif shift.status == ShiftStatus.REST_DAY:
             # FIXED: For rest days, clear time and work fields
@@ -201,10 +396,7 @@ def create_or_update_shift():
             shift.end_time = None
             shift.role = None
             # Keep work arrangement for leave types (might be WFH, etc.)
-            if data.get('work_arrangement'):
-                shift.work_arrangement = WorkArrangement(data.get('work_arrangement', 'onsite'))
-            else:
-                shift.work_arrangement = WorkArrangement.ONSITE
+            shift.work_arrangement = work_arrangement
         
         # Always set these fields regardless of status
         shift.notes = data.get('notes', '') or None
@@ -213,7 +405,16 @@ def create_or_update_shift():
         if not shift_id or shift_id == '':
             db.session.add(shift)
         
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # A concurrent create took the same sequence (uq_shift_emp_date_seq) - retry once
+            db.session.rollback()
+            if shift_id:
+                raise
+            shift.sequence = _next_shift_sequence(employee_id, shift.date)
+            db.session.add(shift)
+            db.session.commit()
         
         return jsonify({
             'success': True,
@@ -241,7 +442,7 @@ def get_employee_day_shifts(employee_id, date_str):
         # UPDATED: Check permissions for viewing
         can_view = False
         
-        if current_user.can_edit_schedule():
+        if _can_edit():
             can_view = True
         elif employee_id == current_user.id:
             can_view = True
@@ -257,7 +458,7 @@ def get_employee_day_shifts(employee_id, date_str):
         if not can_view:
             return jsonify({'success': False, 'error': 'Insufficient permissions'}), 403
         
-        shift_date = datetime.strptime(date_str, '%Y-%m-%d').date()
+        shift_date = date.fromisoformat(date_str)
         shifts = Shift.query.filter_by(
             employee_id=employee_id,
             date=shift_date
@@ -269,20 +470,21 @@ def get_employee_day_shifts(employee_id, date_str):
                 'id': shift.id,
                 'employee_id': shift.employee_id,
                 'date': shift.date.isoformat(),
-                'start_time': shift.start_time.strftime('%H:%M') if shift.start_time else '',
-                'end_time': shift.end_time.strftime('%H:%M') if shift.end_time else '',
+                'start_time': fmt_time(shift.start_time),
+                'end_time': fmt_time(shift.end_time),
                 'role': shift.role or '',
                 'status': shift.status.value,
                 'notes': shift.notes or '',
                 'color': shift.color or '#007bff',
                 'sequence': shift.sequence,
-                'work_arrangement': shift.work_arrangement.value if shift.work_arrangement else 'onsite'
+                'work_arrangement': _arr_value(shift)
             })
         
-        return jsonify({
+        # orjson encodes in C; times stay pre-formatted 'HH:MM' so the payload is unchanged
+        return Response(orjson.dumps({
             'success': True,
             'shifts': shifts_data
-        })
+        }), mimetype='application/json')
         
     except Exception as e:
         return jsonify({'success': False, 'error': f'Error loading shifts: {str(e)}'}), 500
@@ -297,7 +499,7 @@ def delete_shift(shift_id):
             return jsonify({'success': False, 'error': 'Shift not found'}), 404
         
         # Check permissions - only allow editing own shifts for regular employees
-        if not current_user.can_edit_schedule() and shift.employee_id != current_user.id:
+        if not _can_edit() and shift.employee_id != current_user.id:
             return jsonify({'success': False, 'error': 'Insufficient permissions'}), 403
         
         db.session.delete(shift)
@@ -321,14 +523,29 @@ def get_date_remarks():
         if not start_date_str or not end_date_str:
             return jsonify({'success': False, 'error': 'Start and end dates required'}), 400
         
-        start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
-        end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
+        start_date = date.fromisoformat(start_date_str)
+        end_date = date.fromisoformat(end_date_str)
         
-        remarks = DateRemark.get_remarks_for_period(start_date, end_date)
+        # Project only the serialized columns - no ORM objects are hydrated
+        rows = db.session.execute(
+            select(DateRemark.id, DateRemark.date, DateRemark.title, DateRemark.description,
+                   DateRemark.remark_type, DateRemark.color, DateRemark.is_work_day)
+            .where(DateRemark.date.between(start_date, end_date))
+        )
         
         return jsonify({
             'success': True,
-            'remarks': [remark.to_dict() for remark in remarks]
+            'remarks': [{
+                'id': row.id,
+                'date': row.date.isoformat(),
+                'title': row.title,
+                'description': row.description,
+                'remark_type': row.remark_type.value,
+                'color': row.color,
+                'is_work_day': row.is_work_day,
+                'display_name': row.title,
+                'badge_class': DateRemark.BADGE_CLASSES.get(row.remark_type, 'badge-secondary')
+            } for row in rows]
         })
     except Exception as e:
         return jsonify({'success': False, 'error': f'Error loading date remarks: {str(e)}'}), 500
@@ -340,12 +557,12 @@ def create_or_update_date_remark():
     """Create or update a date remark"""
     try:
         # Check permissions - only managers and admins can create/edit date remarks
-        if not current_user.can_edit_schedule():
+        if not _can_edit():
             return jsonify({'success': False, 'error': 'Insufficient permissions'}), 403
         
         data = request.get_json()
         
-        remark_date = datetime.strptime(data['date'], '%Y-%m-%d').date()
+        remark_date = date.fromisoformat(data['date'])
         
         # Check if remark already exists for this date
         existing_remark = DateRemark.get_remark_for_date(remark_date)
@@ -388,7 +605,7 @@ def delete_date_remark(remark_id):
     """Delete a date remark"""
     try:
         # Check permissions
-        if not current_user.can_edit_schedule():
+        if not _can_edit():
             return jsonify({'success': False, 'error': 'Insufficient permissions'}), 403
         
         remark = DateRemark.query.get(remark_id)
@@ -407,28 +624,12 @@ def delete_date_remark(remark_id):
 @login_required
 def get_preset_holidays():
     """Get preset holidays for the Philippines"""
-    if not current_user.can_edit_schedule():
+    if not _can_edit():
         return jsonify({'success': False, 'error': 'Insufficient permissions'}), 403
     
-    # You can expand this with more holidays or make it configurable
-    preset_holidays = [
-        {'title': 'New Year\'s Day', 'month': 1, 'day': 1},
-        {'title': 'Maundy Thursday', 'month': 3, 'day': 28},  # Example date - varies yearly
-        {'title': 'Good Friday', 'month': 3, 'day': 29},      # Example date - varies yearly
-        {'title': 'Araw ng Kagitingan', 'month': 4, 'day': 9},
-        {'title': 'Labor Day', 'month': 5, 'day': 1},
-        {'title': 'Independence Day', 'month': 6, 'day': 12},
-        {'title': 'National Heroes Day', 'month': 8, 'day': 26},  # Last Monday of August
-        {'title': 'All Saints\' Day', 'month': 11, 'day': 1},
-        {'title': 'Bonifacio Day', 'month': 11, 'day': 30},
-        {'title': 'Christmas Day', 'month': 12, 'day': 25},
-        {'title': 'Rizal Day', 'month': 12, 'day': 30},
-        {'title': 'New Year\'s Eve', 'month': 12, 'day': 31}
-    ]
-    
     return jsonify({
         'success': True,
-        'holidays': preset_holidays
+        'holidays': PRESET_HOLIDAYS
     })
 
 @bp.route('/api/holidays/apply-preset', methods=['POST'])
@@ -436,38 +637,43 @@ def get_preset_holidays():
 def apply_preset_holidays():
     """Apply preset holidays for a specific year"""
     try:
-        if not current_user.can_edit_schedule():
+        if not _can_edit():
             return jsonify({'success': False, 'error': 'Insufficient permissions'}), 403
         
         data = request.get_json()
         year = int(data.get('year', datetime.now().year))
         selected_holidays = data.get('holidays', [])
         
-        created_count = 0
+        holiday_dates = [date(year, h['month'], h['day']) for h in selected_holidays]
+        
+        # Check which holidays already exist with a single IN query
+        existing_dates = set(
+            db.session.scalars(select(DateRemark.date).where(DateRemark.date.in_(holiday_dates)))
+        )
+        
+        rows = []
         skipped_count = 0
         
-        for holiday in selected_holidays:
-            holiday_date = date(year, holiday['month'], holiday['day'])
-            
-            # Check if holiday already exists
-            existing = DateRemark.get_remark_for_date(holiday_date)
-            if existing:
+        for holiday, holiday_date in zip(selected_holidays, holiday_dates):
+            if holiday_date in existing_dates:
                 skipped_count += 1
                 continue
             
             # Create new holiday
-            remark = DateRemark(
-                date=holiday_date,
-                title=holiday['title'],
-                remark_type=DateRemarkType.HOLIDAY,
-                color='#dc3545',
-                is_work_day=False,
-                created_by_id=current_user.id
-            )
-            
-            db.session.add(remark)
-            created_count += 1
+            rows.append({
+                'date': holiday_date,
+                'title': holiday['title'],
+                'remark_type': DateRemarkType.HOLIDAY,
+                'color': '#dc3545',
+                'is_work_day': False,
+                'created_by_id': current_user.id
+            })
+            existing_dates.add(holiday_date)
         
+        created_count = len(rows)
+        if rows:
+            # Core executemany INSERT - no ORM objects or identity-map bookkeeping
+            db.session.execute(DateRemark.__table__.insert(), rows)
         db.session.commit()
         
         return jsonify({
@@ -484,7 +690,7 @@ def apply_preset_holidays():
 @bp.route('/export')
 @login_required
 def export_schedule():
-    if not current_user.can_edit_schedule():
+    if not _can_edit():
         flash('You do not have permission to export schedules.', 'danger')
         return redirect(url_for('schedule.view_schedule'))
     
@@ -495,40 +701,38 @@ def export_schedule():
         flash('Please provide start and end dates for export.', 'warning')
         return redirect(url_for('schedule.view_schedule'))
     
-    start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
-    end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
+    start_date = date.fromisoformat(start_date_str)
+    end_date = date.fromisoformat(end_date_str)
     
-    # Get shifts for date range
-    shifts = Shift.query.filter(
+    # Get shifts for date range as plain rows - employee names come from the same join
+    shift_rows = select(
+        User.first_name, User.last_name, Shift.date, Shift.start_time, Shift.end_time,
+        Shift.role, Shift.status, Shift.notes, Shift.color
+    ).join(User, Shift.employee_id == User.id).where(
         Shift.date.between(start_date, end_date)
-    ).join(User).all()
-    
-    # Create CSV
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Write header
-    writer.writerow(['Employee', 'Date', 'Start Time', 'End Time', 'Role', 'Status', 'Notes', 'Color'])
-    
-    # Write shift data
-    for shift in shifts:
-        writer.writerow([
-            shift.employee.full_name,
-            shift.date.strftime('%Y-%m-%d'),
-            shift.start_time.strftime('%H:%M') if shift.start_time else '',
-            shift.end_time.strftime('%H:%M') if shift.end_time else '',
-            shift.role or '',
-            shift.status.value,
-            shift.notes or '',
-            shift.color or ''
-        ])
-    
-    # Create response
-    response = make_response(output.getvalue())
-    response.headers['Content-Type'] = 'text/csv'
-    response.headers['Content-Disposition'] = f'attachment; filename=schedule_{start_date}_{end_date}.csv'
-    
-    return response
+    ).execution_options(yield_per=500)
+    
+    # Stream the CSV row by row instead of buffering the whole file
+    def generate():
+        writer = csv.writer(_Echo())
+        
+        # Write header
+        yield writer.writerow(['Employee', 'Date', 'Start Time', 'End Time', 'Role', 'Status', 'Notes', 'Color'])
+        
+        # Write shift data
+        for row in db.session.execute(shift_rows):
+            yield writer.writerow([
+                f"{row.first_name} {row.last_name}",
+                row.date.isoformat(),
+                fmt_time(row.start_time),
+                fmt_time(row.end_time),
+                row.role or '',
+                row.status.value,
+                row.notes or '',
+                row.color or ''
+            ])
+    
+    return _csv_response(generate(), f'schedule_{start_date}_{end_date}.csv')
 
 @bp.route('/api/employee/<int:employee_id>/schedule-format')
 @login_required
@@ -536,7 +740,7 @@ def get_employee_schedule_format(employee_id):
     """Get employee's schedule format for break calculations"""
     try:
         # Check permissions
-        if not current_user.can_edit_schedule() and employee_id != current_user.id:
+        if not _can_edit() and employee_id != current_user.id:
             return jsonify({'success': False, 'error': 'Insufficient permissions'}), 403
         
         employee = User.query.get(employee_id)
@@ -556,7 +760,7 @@ def get_employee_schedule_format(employee_id):
 @login_required
 def export_worksched():
     """Export work schedule in the specific company format for managers"""
-    if not current_user.can_edit_schedule():
+    if not _can_edit():
         flash('You do not have permission to export work schedules.', 'danger')
         return redirect(url_for('schedule.view_schedule'))
     
@@ -567,61 +771,30 @@ def export_worksched():
         flash('Please provide start and end dates for export.', 'warning')
         return redirect(url_for('schedule.view_schedule'))
     
-    start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
-    end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
+    start_date = date.fromisoformat(start_date_str)
+    end_date = date.fromisoformat(end_date_str)
     
-    # Get team members based on manager's scope
-    if current_user.section_id:
-        team_members = User.query.filter_by(section_id=current_user.section_id, is_active=True).all()
-    elif current_user.unit_id:
-        team_members = User.query.filter_by(unit_id=current_user.unit_id, is_active=True).all()
-    else:
-        team_members = User.query.filter_by(is_active=True).all()
+    # Get team members based on manager's scope, already in export order
+    member_ids_q = scoped_user_query(current_user).with_entities(User.id)
+    team_members = scoped_user_query(current_user).order_by(User.last_name, User.first_name).all()
     
     # Get all shifts for the date range and team members
-    shifts = Shift.query.filter(
+    # Only the columns the worksched rows are built from are hydrated
+    shifts = Shift.query.options(load_only(
+        Shift.employee_id, Shift.date, Shift.start_time, Shift.end_time, Shift.status, Shift.sequence
+    ), raiseload('*')).filter(
         Shift.date.between(start_date, end_date),
-        Shift.employee_id.in_([tm.id for tm in team_members])
+        Shift.employee_id.in_(member_ids_q)
     ).order_by(Shift.employee_id, Shift.date, Shift.sequence).all()
     
-    # Organize shifts by employee and date
-    employee_shifts = {}
+    # Organize shifts by (employee, date ordinal) - flat integer keys
+    employee_shifts = defaultdict(list)
     for shift in shifts:
-        emp_id = shift.employee_id
-        shift_date = shift.date
-        
-        if emp_id not in employee_shifts:
-            employee_shifts[emp_id] = {}
-        if shift_date not in employee_shifts[emp_id]:
-            employee_shifts[emp_id][shift_date] = []
-        
-        employee_shifts[emp_id][shift_date].append(shift)
+        employee_shifts[(shift.employee_id, shift.date.toordinal())].append(shift)
     
-    # Create CSV in the specific company format
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Write header rows (exactly as in the template)
-    writer.writerow(['Regular Work Schedule', '', '', '', '', '', '', '', '', '', ''])
-    writer.writerow([
-        'EMPLOYEE', 
-        'WORK SCHEDULE (Dates)', 
-        '', 
-        'DWS', 
-        'WORK SCHEDULE\n(TIME)', 
-        '', 
-        '1 HR UNPAID BREAK\n(9-HOUR SHIFT)', 
-        '', 
-        '30 MIN PAID BREAK\n(8-HOUR SHIFT)', 
-        '', 
-        ''
-    ])
-    writer.writerow(['FROM', 'TO', 'START', 'END', 'START', 'END', 'START', 'END', 'START', 'END', ''])
-    writer.writerow(['', '', '', '', '', '', '', '', '', '', 'REMARKS'])
-    
-    def get_standard_schedule_for_employee(employee):
+    def get_standard_schedule_for_employee(nine_hour):
         """Get standard work schedule based on employee's schedule format - FALLBACK ONLY"""
-        if employee.schedule_format == ScheduleFormat.NINE_HOUR:
+        if nine_hour:
             return {
                 'start_time': '10:00',  # Default fallback start time
                 'end_time': '19:00',    # 10:00 + 9 hours = 19:00 (7PM)
@@ -640,25 +813,7 @@ def export_worksched():
                 'break_30min_end': '13:30'
             }
     
-    def get_standard_shift_times(shift, employee):
-        """Get standardized shift times based on employee's schedule format"""
-        if not shift.start_time:
-            return '', ''
-        
-        start_datetime = datetime.combine(shift.date, shift.start_time)
-        
-        # Calculate end time based on employee's schedule format
-        if employee.schedule_format == ScheduleFormat.NINE_HOUR:
-            end_datetime = start_datetime + timedelta(hours=9)
-        else:  # 8-hour shift or default
-            end_datetime = start_datetime + timedelta(hours=8)
-        
-        work_start = start_datetime.strftime('%H:%M')
-        work_end = end_datetime.strftime('%H:%M')
-        
-        return work_start, work_end
-
-    def get_schedule_for_leave_day(employee, employee_shifts_for_date):
+    def get_schedule_for_leave_day(nine_hour, employee_shifts_for_date):
         """Get schedule for leave day based on 1st shift start time"""
         
         # Find the first shift (sequence #1) for this employee on this date
@@ -666,70 +821,12 @@ def export_worksched():
             first_shift = min(employee_shifts_for_date, key=lambda x: x.sequence)
             
             if first_shift.start_time:
-                # Use 1st shift start time as base
-                start_datetime = datetime.combine(date.today(), first_shift.start_time)
-                
-                # Calculate end time based on employee's schedule format
-                if employee.schedule_format == ScheduleFormat.NINE_HOUR:
-                    end_datetime = start_datetime + timedelta(hours=9)
-                    break_duration = 60  # 1 hour break
-                else:  # 8-hour shift
-                    end_datetime = start_datetime + timedelta(hours=8)
-                    break_duration = 30  # 30 minute break
-                
-                # Calculate break times (start 3 hours after shift start)
-                break_start_datetime = start_datetime + timedelta(hours=3)
-                break_end_datetime = break_start_datetime + timedelta(minutes=break_duration)
-                
-                if employee.schedule_format == ScheduleFormat.NINE_HOUR:
-                    return {
-                        'start_time': start_datetime.strftime('%H:%M'),
-                        'end_time': end_datetime.strftime('%H:%M'),
-                        'break_1hr_start': break_start_datetime.strftime('%H:%M'),
-                        'break_1hr_end': break_end_datetime.strftime('%H:%M'),
-                        'break_30min_start': '',
-                        'break_30min_end': ''
-                    }
-                else:  # 8-hour shift
-                    return {
-                        'start_time': start_datetime.strftime('%H:%M'),
-                        'end_time': end_datetime.strftime('%H:%M'),
-                        'break_1hr_start': '',
-                        'break_1hr_end': '',
-                        'break_30min_start': break_start_datetime.strftime('%H:%M'),
-                        'break_30min_end': break_end_datetime.strftime('%H:%M')
-                    }
+                # Use 1st shift start time as base; breaks start 3 hours after shift start
+                return dict(zip(_WORKSCHED_TIME_KEYS, _worksched_times(first_shift.start_time, nine_hour)))
         
         # Fallback to standard schedule if no shifts found or no start time
-        return get_standard_schedule_for_employee(employee)
-
-    def calculate_break_times_for_shift(shift, employee):
-        """Calculate break times based on employee's schedule format and shift start time"""
-        if not shift.start_time or not shift.qualifies_for_break:
-            return ('', '', '', '')  # No break times if shift < 4 hours or no start time
-        
-        start_datetime = datetime.combine(shift.date, shift.start_time)
-        break_start_datetime = start_datetime + timedelta(hours=3)  # Break starts 3 hours after shift start
-        
-        break_duration = employee.get_break_duration_minutes()
-        break_end_datetime = break_start_datetime + timedelta(minutes=break_duration)
-        
-        # Determine which columns to fill based on employee's schedule format
-        if employee.schedule_format == ScheduleFormat.NINE_HOUR:  # 1 hr break
-            return (
-                break_start_datetime.strftime('%H:%M'),  # 1hr break start
-                break_end_datetime.strftime('%H:%M'),    # 1hr break end
-                '',  # 30min break start (empty)
-                ''   # 30min break end (empty)
-            )
-        else:  # 8-hour shift or others (30 min break)
-            return (
-                '',  # 1hr break start (empty)
-                '',  # 1hr break end (empty)
-                break_start_datetime.strftime('%H:%M'),  # 30min break start
-                break_end_datetime.strftime('%H:%M')     # 30min break end
-            )
-    
+        return get_standard_schedule_for_employee(nine_hour)
+
     def get_filtered_remarks(status_value):
         """Filter remarks to show only specific leave type abbreviations"""
         leave_abbreviations = {
@@ -752,116 +849,104 @@ def export_worksched():
         # Return the abbreviation if it's a recognized leave type, otherwise return blank
         return leave_abbreviations.get(status_value, '')
     
-    # FIXED: Generate data by employee first, then by date
-    for employee in sorted(team_members, key=lambda x: x.full_name):
-        current_date = start_date
-        while current_date <= end_date:
-            emp_shifts = employee_shifts.get(employee.id, {}).get(current_date, [])
-            
-            # Format employee name as "LASTNAME, FIRSTNAME"
-            employee_name = f"{employee.last_name.upper()}, {employee.first_name.upper()}"
-            
-            # Format date as DD-MM-YYYY
-            formatted_date = current_date.strftime('%d-%m-%Y')
+    # Stream the CSV in the specific company format instead of buffering it
+    def generate():
+        writer = csv.writer(_Echo())
             
-            if not emp_shifts:
-                # No shifts = rest day (use blank remarks)
-                writer.writerow([
-                    employee_name,
-                    formatted_date,
-                    formatted_date,
-                    'FREE',  # DWS = FREE for rest days
-                    '',  # Work start time
-                    '',  # Work end time
-                    '',  # 1hr break start
-                    '',  # 1hr break end
-                    '',  # 30min break start
-                    '',  # 30min break end
-                    ''   # Remarks - blank for rest days
-                ])
-            else:
-                # CORRECTED: For leave days, only create ONE row (not one per shift)
-                leave_shifts = [s for s in emp_shifts if s.status in [
-                    ShiftStatus.SICK_LEAVE, ShiftStatus.PERSONAL_LEAVE, 
-                    ShiftStatus.EMERGENCY_LEAVE, ShiftStatus.ANNUAL_VACATION,
-                    ShiftStatus.HOLIDAY_OFF, ShiftStatus.BEREAVEMENT_LEAVE,
-                    ShiftStatus.PATERNITY_LEAVE, ShiftStatus.MATERNITY_LEAVE,
-                    ShiftStatus.UNION_LEAVE, ShiftStatus.FIRE_CALAMITY_LEAVE,
-                    ShiftStatus.SOLO_PARENT_LEAVE, ShiftStatus.SPECIAL_LEAVE_WOMEN,
-                    ShiftStatus.VAWC_LEAVE, ShiftStatus.OTHER, ShiftStatus.OFFSET
-                ]]
-                
-                rest_day_shifts = [s for s in emp_shifts if s.status == ShiftStatus.REST_DAY]
+        # Write header rows (exactly as in the template)
+        yield writer.writerow(['Regular Work Schedule', '', '', '', '', '', '', '', '', '', ''])
+        yield writer.writerow([
+            'EMPLOYEE', 
+            'WORK SCHEDULE (Dates)', 
+            '', 
+            'DWS', 
+            'WORK SCHEDULE\n(TIME)', 
+            '', 
+            '1 HR UNPAID BREAK\n(9-HOUR SHIFT)', 
+            '', 
+            '30 MIN PAID BREAK\n(8-HOUR SHIFT)', 
+            '', 
+            ''
+        ])
+        yield writer.writerow(['FROM', 'TO', 'START', 'END', 'START', 'END', 'START', 'END', 'START', 'END', ''])
+        yield writer.writerow(['', '', '', '', '', '', '', '', '', '', 'REMARKS'])
+        
+        # Format employee names as "LASTNAME, FIRSTNAME" once per employee
+        name_cache = {e.id: f"{e.last_name.upper()}, {e.first_name.upper()}" for e in team_members}
+        
+        # Build the date range and its DD-MM-YYYY labels once for all employees
+        num_days = (end_date - start_date).days + 1
+        all_dates = [start_date + timedelta(days=i) for i in range(num_days)]
+        date_keys = [(d.toordinal(), d.strftime('%d-%m-%Y')) for d in all_dates]
+        
+        # Rest-day rows only differ in name and date: DWS = FREE, blank times and remarks
+        rest_day_columns = ('FREE', '', '', '', '', '', '', '')
+        
+        # Rows are buffered per employee and flushed with one writerows() call
+        buffer = io.StringIO()
+        buffer_writer = csv.writer(buffer)
+        
+        # FIXED: Generate data by employee first, then by date
+        for employee in team_members:
+            employee_name = name_cache[employee.id]
+            # Schedule format decides work length and break columns - resolved once per employee
+            nine_hour = employee.schedule_format == ScheduleFormat.NINE_HOUR
+            rows = []
+            for date_ordinal, formatted_date in date_keys:
+                emp_shifts = employee_shifts.get((employee.id, date_ordinal), ())
                 
-                if leave_shifts:
-                    # CORRECTED: Leave days get ONE row using 1st shift start time
-                    leave_schedule = get_schedule_for_leave_day(employee, emp_shifts)
-                    status_value = leave_shifts[0].status.value
-                    remarks = get_filtered_remarks(status_value)
+                if not emp_shifts:
+                    # No shifts = rest day (use blank remarks)
+                    rows.append((employee_name, formatted_date, formatted_date, *rest_day_columns))
+                else:
+                    # CORRECTED: For leave days, only create ONE row (not one per shift)
+                    leave_shifts = [s for s in emp_shifts if s.status in LEAVE_STATUSES]
                     
-                    writer.writerow([
-                        employee_name,
-                        formatted_date,
-                        formatted_date,
-                        '',  # No DWS for leave
-                        leave_schedule['start_time'],
-                        leave_schedule['end_time'],
-                        leave_schedule['break_1hr_start'],
-                        leave_schedule['break_1hr_end'],
-                        leave_schedule['break_30min_start'],
-                        leave_schedule['break_30min_end'],
-                        remarks
-                    ])
+                    rest_day_shifts = [s for s in emp_shifts if s.status == ShiftStatus.REST_DAY]
                     
-                elif rest_day_shifts:
-                    # Rest days use blank remarks
-                    writer.writerow([
-                        employee_name,
-                        formatted_date,
-                        formatted_date,
-                        'FREE',
-                        '',
-                        '',
-                        '',
-                        '',
-                        '',
-                        '',
-                        ''  # Blank remarks for rest days
-                    ])
-                else:
-                    # Handle regular scheduled shifts (one row per shift)
-                    for shift in emp_shifts:
-                        # CORRECTED: Use standard shift times (not actual times)
-                        work_start, work_end = get_standard_shift_times(shift, employee)
-                        
-                        # Calculate break times based on employee's schedule format
-                        break_1hr_start, break_1hr_end, break_30min_start, break_30min_end = calculate_break_times_for_shift(shift, employee)
+                    if leave_shifts:
+                        # CORRECTED: Leave days get ONE row using 1st shift start time
+                        leave_schedule = get_schedule_for_leave_day(nine_hour, emp_shifts)
+                        status_value = leave_shifts[0].status.value
+                        remarks = get_filtered_remarks(status_value)
                         
-                        # For regular shifts, use blank remarks
-                        remarks = ''
-                        
-                        writer.writerow([
+                        rows.append([
                             employee_name,
                             formatted_date,
-                            formatted_date,      # Same as FROM date
-                            '',                  # DWS blank for regular schedule
-                            work_start,          # CORRECTED: Standard shift start time
-                            work_end,            # CORRECTED: Standard shift end time
-                            break_1hr_start,     # 1hr paid break start (for 9-hour shifts)
-                            break_1hr_end,       # 1hr paid break end (for 9-hour shifts)
-                            break_30min_start,   # 30min paid break start (for 8-hour shifts)
-                            break_30min_end,     # 30min paid break end (for 8-hour shifts)
-                            remarks              # Blank remarks for regular shifts
+                            formatted_date,
+                            '',  # No DWS for leave
+                            leave_schedule['start_time'],
+                            leave_schedule['end_time'],
+                            leave_schedule['break_1hr_start'],
+                            leave_schedule['break_1hr_end'],
+                            leave_schedule['break_30min_start'],
+                            leave_schedule['break_30min_end'],
+                            remarks
                         ])
+                        
+                    elif rest_day_shifts:
+                        # Rest days use blank remarks
+                        rows.append((employee_name, formatted_date, formatted_date, *rest_day_columns))
+                    else:
+                        # Handle regular scheduled shifts (one row per shift)
+                        for shift in emp_shifts:
+                            # CORRECTED: Use standard shift times (not actual times)
+                            rows.append((
+                                employee_name,
+                                formatted_date,
+                                formatted_date,      # Same as FROM date
+                                *_worksched_shift_columns(shift.start_time, shift.qualifies_for_break, nine_hour)
+                            ))
             
-            current_date += timedelta(days=1)
-    
-    # Create response
-    response = make_response(output.getvalue())
-    response.headers['Content-Type'] = 'text/csv'
-    response.headers['Content-Disposition'] = f'attachment; filename=worksched_{start_date.strftime("%b_%d")}_to_{end_date.strftime("%b_%d_%Y")}.csv'
-    
-    return response
+            buffer_writer.writerows(rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    
+    return _csv_response(
+        generate(),
+        f'worksched_{start_date.strftime("%b_%d")}_to_{end_date.strftime("%b_%d_%Y")}.csv'
+    )
 
 # OTND EXPORT DATA
 
@@ -870,7 +955,7 @@ def export_worksched():
 @login_required
 def export_otnd():
     """Export OTND (Overtime & Night Differential) data for payroll processing"""
-    if not current_user.can_edit_schedule():
+    if not _can_edit():
         flash('You do not have permission to export OTND data.', 'danger')
         return redirect(url_for('schedule.view_schedule'))
     
@@ -881,8 +966,8 @@ def export_otnd():
         flash('Please provide start and end dates for OTND export.', 'warning')
         return redirect(url_for('admin.export_data'))
     
-    start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
-    end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
+    start_date = date.fromisoformat(start_date_str)
+    end_date = date.fromisoformat(end_date_str)
     
     # NEW: Extend query range to catch cross-midnight shifts
     extended_start_date = start_date - timedelta(days=1)
@@ -1289,13 +1374,13 @@ def filter_otnd_entries_by_export_range(otnd_entries, export_start_date, export_
 @login_required
 def calendar_view():
     """Calendar view for schedule visualization - Managers and Admins only"""
-    if not current_user.can_edit_schedule():
+    if not _can_edit():
         flash('You do not have permission to access the calendar view.', 'danger')
         return redirect(url_for('schedule.view_schedule'))
     
     # Get date from request or default to current month
     date_str = request.args.get('date', date.today().isoformat())
-    selected_date = datetime.strptime(date_str, '%Y-%m-%d').date()
+    selected_date = date.fromisoformat(date_str)
     
     # Get the first and last day of the month
     first_day = selected_date.replace(day=1)
@@ -1306,12 +1391,7 @@ def calendar_view():
     calendar_end = last_day + timedelta(days=(6 - last_day.weekday()))
     
     # Get team members based on user role and permissions
-    if current_user.section_id:
-        team_members = User.query.filter_by(section_id=current_user.section_id, is_active=True).all()
-    elif current_user.unit_id:
-        team_members = User.query.filter_by(unit_id=current_user.unit_id, is_active=True).all()
-    else:
-        team_members = User.query.filter_by(is_active=True).all()
+    team_members = scoped_user_query(current_user).all()
     
     # Get all shifts for the calendar period
     shifts = Shift.query.filter(
@@ -1330,13 +1410,13 @@ def calendar_view():
             'id': shift.id,
             'employee_id': shift.employee_id,
             'date': shift.date.isoformat(),
-            'start_time': shift.start_time.strftime('%H:%M') if shift.start_time else None,
-            'end_time': shift.end_time.strftime('%H:%M') if shift.end_time else None,
+            'start_time': fmt_time(shift.start_time, None),
+            'end_time': fmt_time(shift.end_time, None),
             'role': shift.role,
             'status': shift.status.value,
             'notes': shift.notes,
             'color': shift.color or shift.status_color,
-            'work_arrangement': shift.work_arrangement.value if shift.work_arrangement else 'onsite',
+            'work_arrangement': _arr_value(shift),
             'sequence': shift.sequence,
             'time_display': shift.time_display
         }
@@ -1408,7 +1488,7 @@ def calendar_view():
 def create_blank_template():
     """Create a BLANK template for clearing schedules"""
     try:
-        if not current_user.can_edit_schedule():
+        if not _can_edit():
             return jsonify({'success': False, 'error': 'Insufficient permissions'}), 403
         
         data = request.get_json()
@@ -1570,10 +1650,10 @@ def create_blank_template():
 def apply_blank_template(template_id):
     """Apply BLANK template to clear schedules"""
     try:
-        if not current_user.can_edit_schedule():
+        if not _can_edit():
             return jsonify({'success': False, 'error': 'Insufficient permissions'}), 403
         
-        template = ScheduleTemplateV2.query.get(template_id)
+        template = db.session.get(ScheduleTemplateV2, template_id)
         if not template:
             return jsonify({'success': False, 'error': 'Template not found'}), 404
         
@@ -1589,8 +1669,8 @@ def apply_blank_template(template_id):
         
         # Parse and validate target dates
         try:
-            target_start = datetime.strptime(data['target_start_date'], '%Y-%m-%d').date()
-            target_end = datetime.strptime(data['target_end_date'], '%Y-%m-%d').date()
+            target_start = date.fromisoformat(data['target_start_date'])
+            target_end = date.fromisoformat(data['target_end_date'])
         except (ValueError, KeyError) as e:
             return jsonify({
                 'success': False, 
@@ -1623,8 +1703,8 @@ def apply_blank_template(template_id):
         preserve_enum_types = []
         if preserve_leave_types:
             try:
-                preserve_enum_types = [ShiftStatus(status) for status in preserve_leave_types]
-            except ValueError as e:
+                preserve_enum_types = [_STATUS_BY_VALUE[status] for status in preserve_leave_types]
+            except (KeyError, TypeError) as e:
                 return jsonify({
                     'success': False, 
                     'error': f'Invalid preserve leave type: {str(e)}'
@@ -1642,7 +1722,7 @@ def apply_blank_template(template_id):
                         'error': 'You can only clear shifts in your own section'
                     }), 403
                     
-                target_section = Section.query.get(target_section_id)
+                target_section = db.session.get(Section, target_section_id)
                 if not target_section:
                     return jsonify({
                         'success': False, 
@@ -1665,7 +1745,7 @@ def apply_blank_template(template_id):
                         'error': 'You can only clear shifts in your own unit'
                     }), 403
                     
-                target_unit = Unit.query.get(target_unit_id)
+                target_unit = db.session.get(Unit, target_unit_id)
                 if not target_unit:
                     return jsonify({
                         'success': False, 
@@ -1786,7 +1866,7 @@ def apply_blank_template(template_id):
 def preview_blank_template(template_id):
     """Preview what a BLANK template application would do"""
     try:
-        template = ScheduleTemplateV2.query.get(template_id)
+        template = db.session.get(ScheduleTemplateV2, template_id)
         if not template:
             return jsonify({'success': False, 'error': 'Template not found'}), 404
         
@@ -1802,8 +1882,8 @@ def preview_blank_template(template_id):
         
         # Parse target dates
         try:
-            target_start = datetime.strptime(data['target_start_date'], '%Y-%m-%d').date()
-            target_end = datetime.strptime(data['target_end_date'], '%Y-%m-%d').date()
+            target_start = date.fromisoformat(data['target_start_date'])
+            target_end = date.fromisoformat(data['target_end_date'])
         except (ValueError, KeyError):
             return jsonify({'success': False, 'error': 'Invalid date format'}), 400
         
@@ -1827,8 +1907,8 @@ def preview_blank_template(template_id):
         preserve_enum_types = []
         if preserve_leave_types:
             try:
-                preserve_enum_types = [ShiftStatus(status) for status in preserve_leave_types]
-            except ValueError:
+                preserve_enum_types = [_STATUS_BY_VALUE[status] for status in preserve_leave_types]
+            except (KeyError, TypeError):
                 preserve_enum_types = []
         
         # Get all shifts in date range
@@ -1959,7 +2039,7 @@ def get_templates():
 def create_template_snapshot():
     """FIXED: Create template from current schedule snapshot with better validation"""
     try:
-        if not current_user.can_edit_schedule():
+        if not _can_edit():
             return jsonify({'success': False, 'error': 'Insufficient permissions'}), 403
         
         data = request.get_json()
@@ -1978,8 +2058,8 @@ def create_template_snapshot():
         
         # FIXED: Parse and validate dates with better error handling
         try:
-            start_date = datetime.strptime(data['start_date'], '%Y-%m-%d').date()
-            end_date = datetime.strptime(data['end_date'], '%Y-%m-%d').date()
+            start_date = date.fromisoformat(data['start_date'])
+            end_date = date.fromisoformat(data['end_date'])
         except ValueError as e:
             return jsonify({
                 'success': False, 
@@ -2172,16 +2252,41 @@ def create_template_snapshot():
             'error': f'Unexpected error creating template: {str(e)}'
         }), 500
 
+def _coerce_int(value):
+    """Coerce a JSON/form ID to int without raising; returns (ok, int_or_None)"""
+    if isinstance(value, bool):
+        return False, None
+    if isinstance(value, int):
+        return True, value
+    if isinstance(value, float):
+        # 12.0 is fine, 12.5 / inf / nan are not
+        return (True, int(value)) if value.is_integer() else (False, None)
+    if isinstance(value, str):
+        text = value.strip()
+        digits = text[1:] if text[:1] in ('+', '-') else text
+        # isascii() too - isdigit() also accepts digits int() can't parse, like '²'
+        if digits.isascii() and digits.isdigit():
+            return True, int(text)
+    return False, None
+
 @bp.route('/api/templates/<int:template_id>/apply', methods=['POST'])
 @login_required
 def apply_template(template_id):
     """FIXED: Apply template to new date range with comprehensive validation"""
     try:
-        if not current_user.can_edit_schedule():
+        if not _can_edit():
             return jsonify({'success': False, 'error': 'Insufficient permissions'}), 403
         
-        template = ScheduleTemplateV2.query.get(template_id)
+        # Lock the template row so concurrent submissions for it don't race;
+        # a row already locked by another apply request comes back as None
+        template = db.session.get(ScheduleTemplateV2, template_id, populate_existing=True,
+                                  with_for_update={'skip_locked': True})
         if not template:
+            if db.session.query(ScheduleTemplateV2.id).filter_by(id=template_id).first():
+                return jsonify({
+                    'success': False, 
+                    'error': 'This template is already being applied. Please try again in a moment.'
+                }), 409
             return jsonify({'success': False, 'error': 'Template not found'}), 404
         
         if not template.can_user_access(current_user):
@@ -2193,8 +2298,8 @@ def apply_template(template_id):
         
         # FIXED: Enhanced validation for target dates
         try:
-            target_start = datetime.strptime(data['target_start_date'], '%Y-%m-%d').date()
-            target_end = datetime.strptime(data['target_end_date'], '%Y-%m-%d').date()
+            target_start = date.fromisoformat(data['target_start_date'])
+            target_end = date.fromisoformat(data['target_end_date'])
         except (ValueError, KeyError) as e:
             return jsonify({
                 'success': False, 
@@ -2218,13 +2323,14 @@ def apply_template(template_id):
             }), 400
         
         # FIXED: Validate template data integrity
-        if not template.template_data or 'shifts' not in template.template_data:
+        tdata = template.template_data
+        if not tdata or 'shifts' not in tdata:
             return jsonify({
                 'success': False, 
                 'error': 'Template data is corrupted or missing'
             }), 500
         
-        if not template.template_data.get('employees'):
+        if not tdata.get('employees'):
             return jsonify({
                 'success': False, 
                 'error': 'Template contains no employee data'
@@ -2238,34 +2344,32 @@ def apply_template(template_id):
         
         # FIXED: Validate organizational scope
         if target_section_id:
-            try:
-                target_section_id = int(target_section_id)
-                target_section = Section.query.get(target_section_id)
-                if not target_section:
-                    return jsonify({
-                        'success': False, 
-                        'error': f'Target section ID {target_section_id} not found'
-                    }), 400
-            except (ValueError, TypeError):
+            ok, target_section_id = _coerce_int(target_section_id)
+            if not ok:
                 return jsonify({
                     'success': False, 
                     'error': 'Invalid target section ID'
                 }), 400
+            target_section = db.session.get(Section, target_section_id)
+            if not target_section:
+                return jsonify({
+                    'success': False, 
+                    'error': f'Target section ID {target_section_id} not found'
+                }), 400
         
         if target_unit_id:
-            try:
-                target_unit_id = int(target_unit_id)
-                target_unit = Unit.query.get(target_unit_id)
-                if not target_unit:
-                    return jsonify({
-                        'success': False, 
-                        'error': f'Target unit ID {target_unit_id} not found'
-                    }), 400
-            except (ValueError, TypeError):
+            ok, target_unit_id = _coerce_int(target_unit_id)
+            if not ok:
                 return jsonify({
                     'success': False, 
                     'error': 'Invalid target unit ID'
                 }), 400
+            target_unit = db.session.get(Unit, target_unit_id)
+            if not target_unit:
+                return jsonify({
+                    'success': False, 
+                    'error': f'Target unit ID {target_unit_id} not found'
+                }), 400
         
         # FIXED: Validate employee mapping overrides format
         if employee_mapping_overrides:
@@ -2277,32 +2381,37 @@ def apply_template(template_id):
             
             # Validate mapping format
             for template_emp_id, target_emp_id in employee_mapping_overrides.items():
-                try:
-                    int(target_emp_id)  # Ensure target employee ID is valid
-                except (ValueError, TypeError):
+                ok, coerced_emp_id = _coerce_int(target_emp_id)  # Ensure target employee ID is valid
+                if not ok:
                     return jsonify({
                         'success': False, 
                         'error': f'Invalid target employee ID in mapping: {target_emp_id}'
                     }), 400
+                # Replacing values of existing keys is safe while iterating
+                employee_mapping_overrides[template_emp_id] = coerced_emp_id
         
         # FIXED: Pre-validate that we can apply the template
         try:
-            # Get target employees to validate scope
+            # Get target employee IDs to validate scope (IDs only - no need to hydrate users)
             if target_section_id:
-                target_employees = User.query.filter_by(section_id=target_section_id, is_active=True).all()
+                scope_filter = {'section_id': target_section_id}
             elif target_unit_id:
-                target_employees = User.query.filter_by(unit_id=target_unit_id, is_active=True).all()
+                scope_filter = {'unit_id': target_unit_id}
             elif template.section_id:
-                target_employees = User.query.filter_by(section_id=template.section_id, is_active=True).all()
+                scope_filter = {'section_id': template.section_id}
             elif template.unit_id:
-                target_employees = User.query.filter_by(unit_id=template.unit_id, is_active=True).all()
+                scope_filter = {'unit_id': template.unit_id}
             else:
                 return jsonify({
                     'success': False, 
                     'error': 'No target organizational scope specified'
                 }), 400
             
-            if not target_employees:
+            target_employee_ids = db.session.scalars(
+                select(User.id).filter_by(is_active=True, **scope_filter)
+            ).all()
+            
+            if not target_employee_ids:
                 return jsonify({
                     'success': False, 
                     'error': 'No active employees found in target scope'
@@ -2312,7 +2421,7 @@ def apply_template(template_id):
             if not replace_existing:
                 existing_shift_count = Shift.query.filter(
                     Shift.date.between(target_start, target_end),
-                    Shift.employee_id.in_([emp.id for emp in target_employees])
+                    Shift.employee_id.in_(target_employee_ids)
                 ).count()
                 
                 if existing_shift_count > 0:
@@ -2328,46 +2437,33 @@ def apply_template(template_id):
                 'error': f'Validation error: {str(e)}'
             }), 400
         
-        # FIXED: Apply template with comprehensive error handling
+        # Hand the shift-creation loop to a background worker so this request
+        # releases its DB connection as soon as validation is done
         try:
-            result = template.apply_to_date_range(
-                start_date=target_start,
-                end_date=target_end,
-                user=current_user,
-                target_section_id=target_section_id,
-                target_unit_id=target_unit_id,
-                employee_mapping_overrides=employee_mapping_overrides,
-                replace_existing=replace_existing
+            job = TemplateApplyJob(
+                template_id=template.id,
+                requested_by_id=current_user.id,
+                params={
+                    'target_start_date': target_start.isoformat(),
+                    'target_end_date': target_end.isoformat(),
+                    'target_section_id': target_section_id,
+                    'target_unit_id': target_unit_id,
+                    'employee_mapping_overrides': employee_mapping_overrides,
+                    'replace_existing': replace_existing
+                }
             )
-            
-            # FIXED: Validate application results
-            if result['created_shifts'] == 0 and result['skipped_shifts'] == 0:
-                return jsonify({
-                    'success': False, 
-                    'error': 'No shifts were created. Check employee mappings and template data.'
-                }), 500
-            
+            db.session.add(job)
             db.session.commit()
             
-            # FIXED: Enhanced success response
-            success_message = f'Template applied successfully! Created {result["created_shifts"]} shifts.'
-            if result['skipped_shifts'] > 0:
-                success_message += f' {result["skipped_shifts"]} shifts were skipped.'
+            submit_to(_template_apply_executor, _run_template_apply_job, job.id)
             
             return jsonify({
                 'success': True,
-                'message': success_message,
-                'result': result,
-                'template_info': {
-                    'name': template.name,
-                    'duration': template.duration_days,
-                    'version': template.template_data.get('version', 'unknown')
-                }
-            })
+                'message': f'Applying template "{template.name}"...',
+                'job_id': job.id,
+                'status_url': url_for('schedule.get_template_apply_job', job_id=job.id)
+            }), 202
             
-        except ValueError as e:
-            db.session.rollback()
-            return jsonify({'success': False, 'error': str(e)}), 400
         except Exception as e:
             db.session.rollback()
             return jsonify({
@@ -2382,12 +2478,89 @@ def apply_template(template_id):
             'error': f'Unexpected error applying template: {str(e)}'
         }), 500
 
+def _run_template_apply_job(job_id):
+    """Background worker for apply_template - creates the shifts and records the outcome"""
+    job = db.session.get(TemplateApplyJob, job_id)
+    # Already marked failed as stale (see TemplateApplyJob.fail_stale_jobs)
+    if not job or job.status != TemplateApplyJob.QUEUED:
+        return
+    
+    job.status = TemplateApplyJob.RUNNING
+    db.session.commit()
+    
+    try:
+        # Serialize concurrent applications of the same template
+        template = db.session.get(ScheduleTemplateV2, job.template_id, with_for_update=True)
+        user = db.session.get(User, job.requested_by_id)
+        if not template or not user:
+            raise ValueError('Template or requesting user no longer exists')
+        
+        params = job.params
+        result = template.apply_to_date_range(
+            start_date=date.fromisoformat(params['target_start_date']),
+            end_date=date.fromisoformat(params['target_end_date']),
+            user=user,
+            target_section_id=params.get('target_section_id'),
+            target_unit_id=params.get('target_unit_id'),
+            employee_mapping_overrides=params.get('employee_mapping_overrides'),
+            replace_existing=params.get('replace_existing', False)
+        )
+        
+        # FIXED: Validate application results
+        if result['created_shifts'] == 0 and result['skipped_shifts'] == 0:
+            raise ValueError('No shifts were created. Check employee mappings and template data.')
+        
+        # FIXED: Enhanced success response
+        success_message = f'Template applied successfully! Created {result["created_shifts"]} shifts.'
+        if result['skipped_shifts'] > 0:
+            success_message += f' {result["skipped_shifts"]} shifts were skipped.'
+        
+        job.result = {
+            'message': success_message,
+            'result': result,
+            'template_info': {
+                'name': template.name,
+                'duration': template.duration_days,
+                'version': template.template_data.get('version', 'unknown')
+            }
+        }
+        job.status = TemplateApplyJob.COMPLETED
+        
+    except Exception as e:
+        db.session.rollback()
+        job = db.session.get(TemplateApplyJob, job_id)
+        job.status = TemplateApplyJob.FAILED
+        job.error = str(e) if isinstance(e, ValueError) else f'Template application failed: {str(e)}'
+    
+    job.completed_at = datetime.utcnow()
+    db.session.commit()
+
+@bp.route('/api/templates/apply-jobs/<job_id>')
+@login_required
+def get_template_apply_job(job_id):
+    """Poll the status of a background template application"""
+    job = db.session.get(TemplateApplyJob, job_id)
+    if not job:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    
+    if job.requested_by_id != current_user.id and not current_user.can_admin():
+        return jsonify({'success': False, 'error': 'Access denied'}), 403
+    
+    # A job lost with a restarted worker would otherwise poll as running forever
+    if not job.is_finished and TemplateApplyJob.fail_stale_jobs():
+        db.session.commit()
+    
+    return jsonify({
+        'success': True,
+        'job': job.to_dict()
+    })
+
 @bp.route('/api/templates/<int:template_id>')
 @login_required
 def get_template_details(template_id):
     """Get detailed template information"""
     try:
-        template = ScheduleTemplateV2.query.get(template_id)
+        template = db.session.get(ScheduleTemplateV2, template_id)
         if not template:
             return jsonify({'success': False, 'error': 'Template not found'}), 404
         
@@ -2409,10 +2582,10 @@ def get_template_details(template_id):
 
 @bp.route('/api/templates/<int:template_id>/preview', methods=['POST'])
 @login_required
-def preview_template_application():
+def preview_template_application(template_id):
     """FIXED: Preview template application with detailed validation"""
     try:
-        template = ScheduleTemplateV2.query.get(template_id)
+        template = db.session.get(ScheduleTemplateV2, template_id)
         if not template:
             return jsonify({'success': False, 'error': 'Template not found'}), 404
         
@@ -2425,32 +2598,41 @@ def preview_template_application():
         
         # Parse target dates
         try:
-            target_start = datetime.strptime(data['target_start_date'], '%Y-%m-%d').date()
-            target_end = datetime.strptime(data['target_end_date'], '%Y-%m-%d').date()
+            target_start = date.fromisoformat(data['target_start_date'])
+            target_end = date.fromisoformat(data['target_end_date'])
         except (ValueError, KeyError):
             return jsonify({'success': False, 'error': 'Invalid date format'}), 400
         
         # FIXED: Validate template data integrity
-        if not template.template_data or not template.template_data.get('shifts'):
+        tdata = template.template_data
+        if not tdata or not tdata.get('shifts'):
             return jsonify({
                 'success': False, 
                 'error': 'Template data is corrupted - cannot generate preview'
             }), 500
         
+        employees_dict = tdata.get('employees', {})
+        shifts_list = tdata['shifts']
+        template_employee_count = len(employees_dict)
+        
         # Get target employees
         target_section_id = data.get('target_section_id')
         target_unit_id = data.get('target_unit_id')
         
+        # Only the columns used by the role analysis and response are loaded
+        employee_columns = load_only(User.id, User.first_name, User.last_name, User.job_title, User.rank)
         if target_section_id:
-            target_employees = User.query.filter_by(section_id=target_section_id, is_active=True).all()
+            target_employees = User.query.options(employee_columns).filter_by(section_id=target_section_id, is_active=True).all()
         elif target_unit_id:
-            target_employees = User.query.filter_by(unit_id=target_unit_id, is_active=True).all()
+            target_employees = User.query.options(employee_columns).filter_by(unit_id=target_unit_id, is_active=True).all()
         else:
             return jsonify({'success': False, 'error': 'No target scope specified'}), 400
         
         if not target_employees:
             return jsonify({'success': False, 'error': 'No employees found in target scope'}), 400
         
+        target_employee_ids = [emp.id for emp in target_employees]
+        
         # FIXED: Enhanced preview data with detailed analysis
         target_duration = (target_end - target_start).days + 1
         template_duration = template.duration_days
@@ -2458,19 +2640,28 @@ def preview_template_application():
         # Check for existing shifts
         existing_shifts = Shift.query.filter(
             Shift.date.between(target_start, target_end),
-            Shift.employee_id.in_([emp.id for emp in target_employees])
+            Shift.employee_id.in_(target_employee_ids)
         ).all()
         
-        # Analyze employee role distribution
+        # Analyze employee role distribution - keyed by (job_title, rank) tuples,
+        # formatted as "title_rank" strings only for the response
         target_roles = {}
         template_roles = {}
+        target_employee_data = []
         
         for emp in target_employees:
-            role_key = f"{emp.job_title or 'General'}_{emp.rank or 'Staff'}"
+            role_key = (emp.job_title or 'General', emp.rank or 'Staff')
             target_roles[role_key] = target_roles.get(role_key, 0) + 1
+            target_employee_data.append({
+                'id': emp.id, 
+                'name': emp.full_name, 
+                'role': emp.job_title,
+                'rank': emp.rank,
+                'role_key': f"{role_key[0]}_{role_key[1]}"
+            })
         
-        for emp_data in template.template_data['employees'].values():
-            role_key = f"{emp_data.get('job_title') or 'General'}_{emp_data.get('rank') or 'Staff'}"
+        for emp_data in employees_dict.values():
+            role_key = (emp_data.get('job_title') or 'General', emp_data.get('rank') or 'Staff')
             template_roles[role_key] = template_roles.get(role_key, 0) + 1
         
         # Calculate mapping potential
@@ -2483,23 +2674,16 @@ def preview_template_application():
                 mappable_employees += template_count
             else:
                 mappable_employees += target_count
+                role_name = f"{template_role[0]}_{template_role[1]}"
                 if target_count == 0:
-                    role_mismatches.append(f"No target employees with role '{template_role}' (need {template_count})")
+                    role_mismatches.append(f"No target employees with role '{role_name}' (need {template_count})")
                 else:
-                    role_mismatches.append(f"Role '{template_role}': need {template_count}, found {target_count}")
+                    role_mismatches.append(f"Role '{role_name}': need {template_count}, found {target_count}")
         
         preview_data = {
-            'target_employees': [
-                {
-                    'id': emp.id, 
-                    'name': emp.full_name, 
-                    'role': emp.job_title,
-                    'rank': emp.rank,
-                    'role_key': f"{emp.job_title or 'General'}_{emp.rank or 'Staff'}"
-                } for emp in target_employees
-            ],
-            'template_employees': dict(template.template_data.get('employees', {})),
-            'shifts_to_create': len(template.template_data.get('shifts', [])),
+            'target_employees': target_employee_data,
+            'template_employees': employees_dict,
+            'shifts_to_create': len(shifts_list),
             'date_range': f"{target_start.strftime('%Y-%m-%d')} to {target_end.strftime('%Y-%m-%d')}",
             'duration_match': target_duration == template_duration,
             'duration_info': {
@@ -2510,21 +2694,20 @@ def preview_template_application():
             'existing_shifts': len(existing_shifts),
             'conflicts': len(existing_shifts) > 0,
             'role_analysis': {
-                'target_roles': target_roles,
-                'template_roles': template_roles,
+                'target_roles': {f"{title}_{rank}": count for (title, rank), count in target_roles.items()},
+                'template_roles': {f"{title}_{rank}": count for (title, rank), count in template_roles.items()},
                 'mappable_employees': mappable_employees,
-                'total_template_employees': len(template.template_data['employees']),
+                'total_template_employees': template_employee_count,
                 'role_mismatches': role_mismatches,
-                'mapping_success_rate': round((mappable_employees / len(template.template_data['employees'])) * 100, 1) if template.template_data['employees'] else 0
+                'mapping_success_rate': round((mappable_employees / template_employee_count) * 100, 1) if template_employee_count else 0
             },
             'template_validation': {
-                'has_metadata': 'metadata' in template.template_data,
-                'version': template.template_data.get('version', 'unknown'),
+                'has_metadata': 'metadata' in tdata,
+                'version': tdata.get('version', 'unknown'),
                 'data_integrity': all([
-                    'shifts' in template.template_data,
-                    'employees' in template.template_data,
-                    len(template.template_data['shifts']) > 0,
-                    len(template.template_data['employees']) > 0
+                    'employees' in tdata,
+                    len(shifts_list) > 0,
+                    template_employee_count > 0
                 ])
             }
         }
@@ -2545,7 +2728,7 @@ def preview_template_application():
 def delete_template(template_id):
     """Delete a schedule template"""
     try:
-        template = ScheduleTemplateV2.query.get(template_id)
+        template = db.session.get(ScheduleTemplateV2, template_id)
         if not template:
             return jsonify({'success': False, 'error': 'Template not found'}), 404
         
@@ -2571,10 +2754,10 @@ def delete_template(template_id):
 def duplicate_template(template_id):
     """Create a copy of existing template"""
     try:
-        if not current_user.can_edit_schedule():
+        if not _can_edit():
             return jsonify({'success': False, 'error': 'Insufficient permissions'}), 403
         
-        original_template = ScheduleTemplateV2.query.get(template_id)
+        original_template = db.session.get(ScheduleTemplateV2, template_id)
         if not original_template:
             return jsonify({'success': False, 'error': 'Template not found'}), 404
         
@@ -2618,6 +2801,7 @@ def duplicate_template(template_id):
 
 @bp.route('/api/organizational-scope')
 @login_required
+@cache.cached(timeout=60, key_prefix=org_scope_cache_key, response_filter=is_cacheable_response)
 def get_organizational_scope():
     """Get available organizational units for template creation/application"""
     try:
@@ -2635,26 +2819,31 @@ def get_organizational_scope():
         }
         
         if current_user.can_admin():
-            # Admins can see all organizational units
+            # Admins can see all organizational units - fetched in one UNION ALL
+            # round trip of (kind, id, name, parent_id) rows
             from app.models import Department, Division, Section, Unit
             
-            scope_data['departments'] = [
-                {'id': dept.id, 'name': dept.name} 
-                for dept in Department.query.order_by(Department.name).all()
-            ]
-            scope_data['divisions'] = [
-                {'id': div.id, 'name': div.name, 'department_id': div.department_id} 
-                for div in Division.query.order_by(Division.name).all()
-            ]
-            scope_data['sections'] = [
-                {'id': sec.id, 'name': sec.name, 'division_id': sec.division_id} 
-                for sec in Section.query.order_by(Section.name).all()
-            ]
-            scope_data['units'] = [
-                {'id': unit.id, 'name': unit.name, 'section_id': unit.section_id} 
-                for unit in Unit.query.order_by(Unit.name).all()
-            ]
-        elif current_user.can_edit_schedule():
+            scope_stmt = union_all(
+                select(literal('departments').label('kind'), Department.id, Department.name.label('name'),
+                       cast(null(), Integer).label('parent_id')),
+                select(literal('divisions'), Division.id, Division.name, Division.department_id),
+                select(literal('sections'), Section.id, Section.name, Section.division_id),
+                select(literal('units'), Unit.id, Unit.name, Unit.section_id)
+            ).order_by(literal_column('name'))
+            
+            parent_keys = {
+                'departments': None,
+                'divisions': 'department_id',
+                'sections': 'division_id',
+                'units': 'section_id'
+            }
+            for kind, scope_id, name, parent_id in db.session.execute(scope_stmt):
+                entry = {'id': scope_id, 'name': name}
+                parent_key = parent_keys[kind]
+                if parent_key:
+                    entry[parent_key] = parent_id
+                scope_data[kind].append(entry)
+        elif _can_edit():
             # Managers can see their organizational scope
             if current_user.department_id:
                 scope_data['departments'] = [
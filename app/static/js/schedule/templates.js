@@ -161,7 +161,12 @@ class ScheduleTemplateManager {
                 body: JSON.stringify(data)
             });
 
-            const result = await response.json();
+            let result = await response.json();
+            
+            // Template application runs in the background - wait for it to finish
+            if (response.status === 202 && result.job_id) {
+                result = await waitForTemplateApplyJob(result.job_id);
+            }
             
             if (result.success) {
                 this.showAlert(result.message, 'success');
@@ -742,7 +747,12 @@ async function quickApplyTemplate() {
             })
         });
         
-        const result = await response.json();
+        let result = await response.json();
+        
+        // Template application runs in the background - wait for it to finish
+        if (response.status === 202 && result.job_id) {
+            result = await waitForTemplateApplyJob(result.job_id);
+        }
         
         if (result.success) {
             showTemplateAlert(result.message, 'success');
@@ -767,6 +777,30 @@ async function quickApplyTemplate() {
     }
 }
 
+// Poll a background template application until it completes or fails
+async function waitForTemplateApplyJob(jobId, intervalMs = 1000, maxAttempts = 300) {
+    for (let attempt = 0; attempt < maxAttempts; attempt++) {
+        await new Promise(resolve => setTimeout(resolve, intervalMs));
+        
+        const response = await fetch(`/schedule/api/templates/apply-jobs/${jobId}`);
+        const data = await response.json();
+        
+        if (!data.success) {
+            return data;
+        }
+        
+        const job = data.job;
+        if (job.status === 'completed') {
+            return { success: true, ...job.result };
+        }
+        if (job.status === 'failed') {
+            return { success: false, error: job.error };
+        }
+    }
+    
+    return { success: false, error: 'Timed out waiting for template application to finish' };
+}
+
 function filterTemplates(type, searchTerm = '') {
     if (!templateManager) return;
     
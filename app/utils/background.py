@@ -0,0 +1,50 @@
+"""
+Background task helpers - run slow work off the request thread.
+
+Tasks run on a small process-local thread pool inside their own application
+context, so they get a fresh scoped DB session (and connection) that is
+released when the task finishes instead of being held by the request.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from app.models import db
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='background')
+
+
+def submit_background(func, *args, **kwargs):
+    """Run func(*args, **kwargs) on the background pool with an app context.
+    
+    Returns the concurrent.futures.Future for callers that need to wait.
+    Pass IDs rather than ORM objects - instances bound to the request session
+    must not cross threads.
+    """
+    return submit_to(_executor, func, *args, **kwargs)
+
+
+def submit_to(executor, func, *args, **kwargs):
+    """Like submit_background, but on the caller's own executor.
+    
+    For long or bursty job types that would otherwise tie up the shared pool
+    (and delay the notification emails queued on it).
+    """
+    app = current_app._get_current_object()
+    
+    def run():
+        with app.app_context():
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                logger.exception("Background task %s failed", getattr(func, '__name__', func))
+                db.session.rollback()
+                raise
+            finally:
+                db.session.remove()
+    
+    return executor.submit(run)
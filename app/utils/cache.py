@@ -0,0 +1,65 @@
+"""
+Response cache helpers shared between blueprints.
+
+The Cache extension itself lives in app/__init__.py next to the other
+extensions; this module holds the key builders and invalidation hooks.
+"""
+
+from flask_login import current_user
+from sqlalchemy import event
+
+from app import cache
+from app.models import AppSettings, Department, Division, EmailSettings, Section, Unit
+from app.utils.email_service import invalidate_app_url, invalidate_notifications_flag
+
+ORG_SCOPE_VERSION_KEY = 'orgscope:version'
+
+
+def org_scope_cache_key():
+    """Per-user key for the organizational scope response.
+    
+    Includes everything the response depends on, plus a version number that
+    is bumped whenever the organization tables change.
+    """
+    version = cache.get(ORG_SCOPE_VERSION_KEY) or 0
+    return (f"orgscope:{version}:{current_user.id}:{current_user.role.value}:"
+            f"{current_user.department_id}:{current_user.division_id}:"
+            f"{current_user.section_id}:{current_user.unit_id}")
+
+
+def is_cacheable_response(rv):
+    """response_filter for cache.cached - only plain 200 responses are stored.
+    
+    Error paths return (response, status) tuples, which are never cached.
+    """
+    return getattr(rv, 'status_code', None) == 200
+
+
+def invalidate_org_scope_cache():
+    """Orphan every cached organizational scope response"""
+    version = cache.get(ORG_SCOPE_VERSION_KEY) or 0
+    cache.set(ORG_SCOPE_VERSION_KEY, version + 1, timeout=0)
+
+
+def _on_org_change(mapper, connection, target):
+    invalidate_org_scope_cache()
+
+
+def _on_email_settings_change(mapper, connection, target):
+    invalidate_notifications_flag()
+
+
+def _on_app_settings_change(mapper, connection, target):
+    invalidate_app_url()
+
+
+def register_cache_invalidation():
+    """Hook cache invalidation into model changes - called once from create_app"""
+    for model in (Department, Division, Section, Unit):
+        for event_name in ('after_insert', 'after_update', 'after_delete'):
+            event.listen(model, event_name, _on_org_change)
+    
+    event.listen(EmailSettings, 'after_insert', _on_email_settings_change)
+    event.listen(EmailSettings, 'after_update', _on_email_settings_change)
+    event.listen(AppSettings, 'after_insert', _on_app_settings_change)
+    event.listen(AppSettings, 'after_update', _on_app_settings_change)
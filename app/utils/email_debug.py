@@ -1,29 +1,38 @@
 # Create new file: app/utils/email_debug.py
 
-from flask import current_app
-from app.models import EmailSettings, AppSettings, User
+from flask import current_app, g
+from sqlalchemy import and_, func, or_
+from app.models import db, EmailSettings, AppSettings, User, UserRole, LeaveApplication, LeaveStatus
 from app.utils.email_service import EmailService
+from datetime import datetime, timedelta
+import smtplib
 import traceback
 
 class EmailDebug:
     """Utility class for debugging email configuration and delivery issues"""
     
     @staticmethod
-    def check_email_configuration():
+    def check_email_configuration(force_refresh=False):
         """
         Comprehensive check of email configuration
         
+        The result is memoized for the current request; pass force_refresh=True
+        to re-run the checks.
+        
         Returns:
             dict: Configuration status and issues
         """
+        if not force_refresh and '_email_config_check' in g:
+            return g._email_config_check
+        
         issues = []
         warnings = []
         status = "OK"
         
         try:
             # Check if EmailSettings exist
-            email_settings = EmailSettings.get_settings()
-            app_settings = AppSettings.get_settings()
+            email_settings = EmailService.get_email_settings()
+            app_settings = EmailService.get_app_settings()
             
             # Check basic SMTP configuration
             if not email_settings.mail_server:
@@ -47,17 +56,18 @@ class EmailDebug:
                 warnings.append("Leave request notifications are disabled")
             
             # Check if there are any approvers who can receive emails
-            approvers = User.query.filter(
-                db.or_(
+            # (first matching row is enough - no need to COUNT them all)
+            has_approver = db.session.query(User.id).filter(
+                or_(
                     User.is_section_approver == True,
                     User.is_unit_approver == True,
                     User.role.in_([UserRole.MANAGER, UserRole.ADMINISTRATOR])
                 ),
                 User.is_active == True,
                 User.email != None
-            ).count()
+            ).first() is not None
             
-            if approvers == 0:
+            if not has_approver:
                 issues.append("No active approvers with email addresses found")
             
             if issues:
@@ -69,7 +79,7 @@ class EmailDebug:
             issues.append(f"Error checking configuration: {str(e)}")
             status = "ERROR"
         
-        return {
+        g._email_config_check = {
             'status': status,
             'issues': issues,
             'warnings': warnings,
@@ -77,15 +87,28 @@ class EmailDebug:
             'notifications_enabled': email_settings.notify_leave_requests,
             'external_url_configured': bool(app_settings.external_url)
         }
+        return g._email_config_check
     
     @staticmethod
-    def test_smtp_connection():
+    def test_smtp_connection(force_refresh=False):
         """
         Test SMTP connection without sending email
         
+        The live SMTP probe (connect, STARTTLS, AUTH) runs at most once per
+        request; pass force_refresh=True to probe again.
+        
         Returns:
             dict: Connection test results
         """
+        if not force_refresh and '_smtp_test' in g:
+            return g._smtp_test
+        
+        g._smtp_test = EmailDebug._probe_smtp_connection()
+        return g._smtp_test
+    
+    @staticmethod
+    def _probe_smtp_connection():
+        """Open and authenticate an SMTP session, then QUIT"""
         try:
             config = EmailService.get_smtp_config()
             
@@ -95,22 +118,18 @@ class EmailDebug:
                     'message': 'SMTP configuration not found or incomplete'
                 }
             
-            import smtplib
-            
-            # Test connection
+            # Test connection (starttls() and login() issue EHLO themselves)
+            server = smtplib.SMTP(config['server'], config['port'])
             if config['use_tls']:
-                server = smtplib.SMTP(config['server'], config['port'])
-                server.ehlo()
                 server.starttls()
-                server.ehlo()
-            else:
-                server = smtplib.SMTP(config['server'], config['port'])
-                server.ehlo()
             
             # Test authentication
             if config['password']:
                 server.login(config['username'], config['password'])
             
+            # Make sure the greeting happened even without TLS/auth
+            server.ehlo_or_helo_if_needed()
+            
             server.quit()
             
             return {
@@ -146,8 +165,6 @@ class EmailDebug:
             dict: Debug information
         """
         try:
-            from app.models import LeaveApplication
-            
             leave_app = LeaveApplication.query.get(leave_application_id)
             if not leave_app:
                 return {
@@ -201,8 +218,7 @@ class EmailDebug:
             smtp_test = EmailDebug.test_smtp_connection()
             
             # Create debug email content
-            from app.utils.email_templates import EmailTemplates
-            app_settings = EmailTemplates.get_app_settings()
+            app_settings = EmailService.get_app_settings()
             
             subject = f"[DEBUG] Email Test from {app_settings.app_name}"
             
@@ -225,7 +241,7 @@ Warnings: {len(config_check['warnings'])}
 SMTP Test Result: {smtp_test['message']}
 
 Application URL: {app_settings.get_full_url()}
-Test Sent At: {EmailTemplates.get_app_settings().get_full_url()}
+Test Sent At: {datetime.now().strftime('%B %d, %Y at %I:%M %p')}
 
 ---
 Email Debug Utility
@@ -233,7 +249,7 @@ Email Debug Utility
             """.strip()
             
             # Try to send the email
-            send_result = EmailService.send_email(to_email, subject, body)
+            send_result = EmailService.send_email_sync(to_email, subject, body)
             
             return {
                 'success': send_result,
@@ -258,37 +274,31 @@ Email Debug Utility
             dict: Email statistics
         """
         try:
-            from app.models import LeaveApplication, User, UserRole
-            
-            # Count users with email addresses
-            total_users = User.query.filter_by(is_active=True).count()
-            users_with_email = User.query.filter(
+            active_with_email = and_(
                 User.is_active == True,
                 User.email != None,
                 User.email != ''
-            ).count()
-            
-            # Count approvers with email addresses
-            approvers_with_email = User.query.filter(
-                db.or_(
-                    User.is_section_approver == True,
-                    User.is_unit_approver == True,
-                    User.role.in_([UserRole.MANAGER, UserRole.ADMINISTRATOR])
+            )
+            is_approver = or_(
+                User.is_section_approver == True,
+                User.is_unit_approver == True,
+                User.role.in_([UserRole.MANAGER, UserRole.ADMINISTRATOR])
+            )
+            
+            # User counts in one pass - COUNT(...) FILTER (WHERE ...) per statistic
+            total_users, users_with_email, approvers_with_email = db.session.query(
+                func.count(User.id).filter(User.is_active == True),
+                func.count(User.id).filter(active_with_email),
+                func.count(User.id).filter(and_(is_approver, active_with_email))
+            ).one()
+            
+            # Recent and pending leave applications in one pass
+            recent_applications, pending_applications = db.session.query(
+                func.count(LeaveApplication.id).filter(
+                    LeaveApplication.created_at >= datetime.utcnow() - timedelta(days=30)
                 ),
-                User.is_active == True,
-                User.email != None,
-                User.email != ''
-            ).count()
-            
-            # Count recent leave applications
-            from datetime import datetime, timedelta
-            recent_applications = LeaveApplication.query.filter(
-                LeaveApplication.created_at >= datetime.utcnow() - timedelta(days=30)
-            ).count()
-            
-            pending_applications = LeaveApplication.query.filter_by(
-                status=LeaveStatus.PENDING
-            ).count()
+                func.count(LeaveApplication.id).filter(LeaveApplication.status == LeaveStatus.PENDING)
+            ).one()
             
             return {
                 'total_active_users': total_users,
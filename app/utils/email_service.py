@@ -1,20 +1,295 @@
 # Replace your app/utils/email_service.py with this working version
 
+import logging
+import queue
 import smtplib
+import threading
+import time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from flask import current_app
+from flask import current_app, g
 from datetime import datetime
+from app.models import EmailSettings, AppSettings
+from app.utils.background import submit_background
+
+logger = logging.getLogger(__name__)
+
+class SMTPConnection:
+    """A live, authenticated SMTP session that can send several messages.
+    
+    Opening a session (TCP connect, STARTTLS handshake, AUTH) costs far more than
+    sending a message over it, so the pool reuses sessions. Usable as a context
+    manager; the session is closed with QUIT on exit.
+    """
+    
+    def __init__(self, config):
+        self.config = config
+        self.server = None
+        self.messages_sent = 0
+        self.last_used = time.monotonic()
+        self.connect()
+    
+    def connect(self):
+        """(Re)open the session using the stored SMTP config"""
+        config = self.config
+        # smtplib sends EHLO lazily: starttls() greets before upgrading and
+        # login()/sendmail() re-greet over TLS, so no explicit ehlo() calls
+        server = smtplib.SMTP(config['server'], config['port'])
+        if config['use_tls']:
+            server.starttls()
+        
+        if config['password']:
+            server.login(config['username'], config['password'])
+        
+        self.server = server
+    
+    def send(self, to_email, message):
+        """Send a Message, reconnecting once if the server dropped the session"""
+        sender = self.config['default_sender']
+        try:
+            self.server.send_message(message, from_addr=sender, to_addrs=[to_email])
+        except smtplib.SMTPServerDisconnected:
+            self.connect()
+            self.server.send_message(message, from_addr=sender, to_addrs=[to_email])
+        self.messages_sent += 1
+        self.last_used = time.monotonic()
+    
+    def close(self):
+        """QUIT the session, ignoring errors from an already-dead connection"""
+        if self.server is None:
+            return
+        try:
+            self.server.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+        self.server = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+class SMTPConnectionPool:
+    """Bounded pool of authenticated SMTP sessions shared by the threads of a worker.
+    
+    At most `size` sessions are in use at once; idle sessions are reused
+    (after a NOOP health check) until they have sent `max_messages` messages,
+    sat idle longer than `idle_timeout` seconds, or the SMTP settings changed.
+    """
+    
+    def __init__(self, size, max_messages=100, idle_timeout=60):
+        self.size = size
+        self.max_messages = max_messages
+        self.idle_timeout = idle_timeout
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._slots = threading.BoundedSemaphore(size)
+    
+    def acquire(self, config, timeout=30):
+        """Check out a ready-to-send connection for `config`"""
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError('Timed out waiting for a pooled SMTP connection')
+        try:
+            while True:
+                try:
+                    connection = self._idle.get_nowait()
+                except queue.Empty:
+                    return SMTPConnection(config)
+                if self._is_reusable(connection, config):
+                    return connection
+                connection.close()
+        except Exception:
+            self._slots.release()
+            raise
+    
+    def release(self, connection, reusable=True):
+        """Return a connection; broken or worn-out connections are closed instead"""
+        try:
+            if (reusable and connection.server is not None
+                    and connection.messages_sent < self.max_messages):
+                self._idle.put_nowait(connection)
+            else:
+                connection.close()
+        except queue.Full:
+            connection.close()
+        finally:
+            self._slots.release()
+    
+    def _is_reusable(self, connection, config):
+        if connection.config != config or connection.messages_sent >= self.max_messages:
+            return False
+        if time.monotonic() - connection.last_used > self.idle_timeout:
+            return False
+        try:
+            return connection.server.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_connection_pool():
+    """Process-wide SMTP pool, or None when EMAIL_POOL_SIZE is 0"""
+    global _pool
+    size = current_app.config.get('EMAIL_POOL_SIZE', 0)
+    if size <= 0:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = SMTPConnectionPool(
+                    size,
+                    max_messages=current_app.config.get('EMAIL_POOL_MAX_MESSAGES', 100),
+                    idle_timeout=current_app.config.get('EMAIL_POOL_IDLE_TIMEOUT', 60)
+                )
+    return _pool
+
+def _build_message(subject, body, html_body, sender):
+    """multipart/alternative message with every header except To"""
+    msg = MIMEMultipart('alternative')
+    msg['From'] = sender
+    msg['Subject'] = subject
+    msg.attach(MIMEText(body, 'plain'))
+    if html_body:
+        msg.attach(MIMEText(html_body, 'html'))
+    return msg
+
+SETTINGS_CACHE_TTL = 30
+
+# (monotonic timestamp, notify_leave_requests) - per worker process
+_notifications_enabled_cache = None
+
+def leave_notifications_enabled():
+    """Whether leave notifications are on, re-read from EmailSettings at most every 30s"""
+    global _notifications_enabled_cache
+    cached = _notifications_enabled_cache
+    now = time.monotonic()
+    if cached is not None and now - cached[0] < SETTINGS_CACHE_TTL:
+        return cached[1]
+    enabled = bool(EmailService.get_email_settings().notify_leave_requests)
+    _notifications_enabled_cache = (now, enabled)
+    return enabled
+
+def invalidate_notifications_flag():
+    """Drop the cached notify_leave_requests flag so the next check reloads it"""
+    global _notifications_enabled_cache
+    _notifications_enabled_cache = None
+
+# (monotonic timestamp, external URL) - per worker process
+_app_url_cache = None
+
+def invalidate_app_url():
+    """Drop the cached external URL so the next get_app_url reloads AppSettings"""
+    global _app_url_cache
+    _app_url_cache = None
+
+# Notification bodies are parsed once at import and filled per send with str.format
+_LEAVE_REQUEST_BODY_TMPL = """New Leave Request Submitted
+
+Reference Code: {reference_code}
+Employee: {employee_name}
+Leave Type: {leave_type}
+Dates: {start_date}
+Total Days: {total_days}
+Reason: {reason}
+Date Filed: {date_filed}
+
+To review and approve this request, please visit:
+{management_url}
+
+---
+Employee Scheduling System - Automated Notification"""
+
+_LEAVE_REQUEST_HTML_TMPL = """
+<h2>New Leave Request Submitted</h2>
+<p><strong>Reference Code:</strong> {reference_code}</p>
+<p><strong>Employee:</strong> {employee_name}</p>
+<p><strong>Leave Type:</strong> {leave_type}</p>
+<p><strong>Dates:</strong> {start_date}</p>
+<p><strong>Total Days:</strong> {total_days}</p>
+<p><strong>Reason:</strong> {reason}</p>
+<p><strong>Date Filed:</strong> {date_filed}</p>
+
+<p><a href="{management_url}" style="background: #007bff; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px;">Review Leave Request</a></p>
+
+<p style="font-size: 12px; color: #666;">Employee Scheduling System - Automated Notification</p>
+"""
+
+_LEAVE_STATUS_BODY_TMPL = """Your Leave Request Has Been {status_word}
+
+Reference Code: {reference_code}
+Leave Type: {leave_type}
+Dates: {start_date}
+Status: {status_word}
+Reviewed By: {approver_name}
+Review Date: {review_date}{comments_text}
+
+To view your leave application details, please visit:
+{my_applications_url}
+
+---
+Employee Scheduling System - Automated Notification"""
+
+_LEAVE_STATUS_HTML_TMPL = """
+<h2 style="color: {status_color};">Your Leave Request Has Been {status_word}</h2>
+<p><strong>Reference Code:</strong> {reference_code}</p>
+<p><strong>Leave Type:</strong> {leave_type}</p>
+<p><strong>Dates:</strong> {start_date}</p>
+<p><strong>Status:</strong> <span style="color: {status_color};">{status_word}</span></p>
+<p><strong>Reviewed By:</strong> {approver_name}</p>
+<p><strong>Review Date:</strong> {review_date}</p>
+{comments_html}
+
+<p><a href="{my_applications_url}" style="background: #007bff; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px;">View My Leave Applications</a></p>
+
+<p style="font-size: 12px; color: #666;">Employee Scheduling System - Automated Notification</p>
+"""
+
+_LEAVE_STATUS_COMMENTS_HTML = '<p><strong>Comments:</strong> {comments}</p>'
+
+_TEST_EMAIL_BODY_TMPL = """Test Email from Employee Scheduling System
+
+This is a test email to verify that your email configuration is working correctly.
+
+Application URL: {app_url}
+Sent at: {sent_at}
+
+If you received this email, your SMTP settings are configured properly!
+
+---
+Employee Scheduling System - Email Configuration Test"""
+
+_TEST_EMAIL_HTML_TMPL = """
+<h2>Test Email from Employee Scheduling System</h2>
+<p>This is a test email to verify that your email configuration is working correctly.</p>
+<p><strong>Application URL:</strong> <a href="{app_url}">{app_url}</a></p>
+<p><strong>Sent at:</strong> {sent_at}</p>
+<p style="color: #28a745;"><strong>✅ If you received this email, your SMTP settings are configured properly!</strong></p>
+<p style="font-size: 12px; color: #666;">Employee Scheduling System - Email Configuration Test</p>
+"""
 
 class EmailService:
     """Simple email service for sending notifications"""
     
+    @staticmethod
+    def get_email_settings():
+        """EmailSettings row, loaded once per app context (request or background job)"""
+        if '_email_settings' not in g:
+            g._email_settings = EmailSettings.get_settings()
+        return g._email_settings
+    
+    @staticmethod
+    def get_app_settings():
+        """AppSettings row, loaded once per app context (request or background job)"""
+        if '_app_settings' not in g:
+            g._app_settings = AppSettings.get_settings()
+        return g._app_settings
+    
     @staticmethod
     def get_smtp_config():
         """Get SMTP configuration from database"""
         try:
-            from app.models import EmailSettings
-            settings = EmailSettings.get_settings()
+            settings = EmailService.get_email_settings()
             
             if not settings.mail_server or not settings.mail_username:
                 return None
@@ -28,80 +303,88 @@ class EmailService:
                 'default_sender': settings.mail_default_sender or settings.mail_username
             }
         except Exception as e:
-            print(f"DEBUG: Error getting SMTP config: {str(e)}")
+            logger.warning("Error getting SMTP config: %s", e)
             return None
     
     @staticmethod
     def get_app_url():
-        """Get application base URL"""
+        """Get application base URL (cached per worker, refreshed at most every 30s)"""
+        global _app_url_cache
+        cached = _app_url_cache
+        now = time.monotonic()
+        if cached is not None and now - cached[0] < SETTINGS_CACHE_TTL:
+            return cached[1]
         try:
-            from app.models import AppSettings
-            settings = AppSettings.get_settings()
-            return settings.external_url or 'http://localhost:5000'
+            settings = EmailService.get_app_settings()
+            app_url = settings.external_url or 'http://localhost:5000'
         except:
             return 'http://localhost:5000'
+        _app_url_cache = (now, app_url)
+        return app_url
     
     @staticmethod
     def send_email(to_email, subject, body, html_body=None):
-        """Send an email using configured SMTP settings"""
+        """Queue an email for delivery on the background pool and return at once
+        
+        The SMTP handshake, AUTH and send happen off the request thread, so the
+        return value only says whether the message was queued (email is
+        configured), not whether it was delivered. Use send_email_sync when the
+        caller needs the delivery result.
+        """
+        if not EmailService.get_smtp_config():
+            logger.debug("Email not configured - skipping email notification")
+            return False
+        submit_background(EmailService.send_email_sync, to_email, subject, body, html_body)
+        return True
+    
+    @staticmethod
+    def send_email_sync(to_email, subject, body, html_body=None):
+        """Send an email using configured SMTP settings, blocking until it is sent"""
         try:
             config = EmailService.get_smtp_config()
             if not config:
-                print("DEBUG: Email not configured - skipping email notification")
+                logger.debug("Email not configured - skipping email notification")
                 return False
             
-            print(f"DEBUG: Sending email to {to_email} with subject: {subject}")
+            logger.debug("Sending email to %s with subject: %s", to_email, subject)
             
             # Create message
-            msg = MIMEMultipart('alternative')
-            msg['From'] = config['default_sender']
+            msg = _build_message(subject, body, html_body, config['default_sender'])
             msg['To'] = to_email
-            msg['Subject'] = subject
-            
-            # Add plain text part
-            msg.attach(MIMEText(body, 'plain'))
-            
-            # Add HTML part if provided
-            if html_body:
-                msg.attach(MIMEText(html_body, 'html'))
             
             # Connect and send
-            if config['use_tls']:
-                server = smtplib.SMTP(config['server'], config['port'])
-                server.ehlo()
-                server.starttls()
-                server.ehlo()
+            pool = get_connection_pool()
+            if pool:
+                pooled = pool.acquire(config)
+                try:
+                    pooled.send(to_email, msg)
+                except Exception:
+                    pool.release(pooled, reusable=False)
+                    raise
+                pool.release(pooled)
             else:
-                server = smtplib.SMTP(config['server'], config['port'])
-                server.ehlo()
-            
-            if config['password']:
-                server.login(config['username'], config['password'])
-            
-            server.sendmail(config['default_sender'], to_email, msg.as_string())
-            server.quit()
+                with SMTPConnection(config) as new_connection:
+                    new_connection.send(to_email, msg)
             
-            print(f"DEBUG: Email sent successfully to {to_email}")
+            logger.debug("Email sent successfully to %s", to_email)
             return True
             
         except Exception as e:
-            print(f"DEBUG: Failed to send email to {to_email}: {str(e)}")
+            logger.warning("Failed to send email to %s: %s", to_email, e)
             return False
     
     @staticmethod
     def send_leave_request_notification(leave_application):
         """Send leave request notification to approver"""
         try:
-            # Check if notifications are enabled
-            from app.models import EmailSettings
-            settings = EmailSettings.get_settings()
-            if not settings.notify_leave_requests:
-                print("DEBUG: Leave request notifications are disabled")
+            # Check if notifications are enabled (cached flag, no query when off)
+            if not leave_notifications_enabled():
+                logger.debug("Leave request notifications are disabled")
                 return False
             
             approver_email = leave_application.approver_email
             if not approver_email:
-                print(f"DEBUG: No approver email for leave request {leave_application.reference_code}")
+                logger.warning("No approver email for leave request %s", leave_application.reference_code)
                 return False
             
             # Create simple email content
@@ -111,59 +394,36 @@ class EmailService:
             app_url = EmailService.get_app_url()
             management_url = f"{app_url.rstrip('/')}/leave/management"
             
-            body = f"""
-New Leave Request Submitted
-
-Reference Code: {leave_application.reference_code}
-Employee: {leave_application.employee_name}
-Leave Type: {leave_application.leave_type.value}
-Dates: {leave_application.start_date}
-Total Days: {leave_application.total_days or 'N/A'}
-Reason: {leave_application.reason}
-Date Filed: {leave_application.date_filed.strftime('%B %d, %Y')}
-
-To review and approve this request, please visit:
-{management_url}
-
----
-Employee Scheduling System - Automated Notification
-            """.strip()
-            
-            # Create simple HTML version
-            html_body = f"""
-            <h2>New Leave Request Submitted</h2>
-            <p><strong>Reference Code:</strong> {leave_application.reference_code}</p>
-            <p><strong>Employee:</strong> {leave_application.employee_name}</p>
-            <p><strong>Leave Type:</strong> {leave_application.leave_type.value}</p>
-            <p><strong>Dates:</strong> {leave_application.start_date}</p>
-            <p><strong>Total Days:</strong> {leave_application.total_days or 'N/A'}</p>
-            <p><strong>Reason:</strong> {leave_application.reason}</p>
-            <p><strong>Date Filed:</strong> {leave_application.date_filed.strftime('%B %d, %Y')}</p>
-            
-            <p><a href="{management_url}" style="background: #007bff; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px;">Review Leave Request</a></p>
-            
-            <p style="font-size: 12px; color: #666;">Employee Scheduling System - Automated Notification</p>
-            """
+            fields = {
+                'reference_code': leave_application.reference_code,
+                'employee_name': leave_application.employee_name,
+                'leave_type': leave_application.leave_type.value,
+                'start_date': leave_application.start_date,
+                'total_days': leave_application.total_days or 'N/A',
+                'reason': leave_application.reason,
+                'date_filed': leave_application.date_filed.strftime('%B %d, %Y'),
+                'management_url': management_url,
+            }
+            body = _LEAVE_REQUEST_BODY_TMPL.format(**fields)
+            html_body = _LEAVE_REQUEST_HTML_TMPL.format(**fields)
             
             return EmailService.send_email(approver_email, subject, body, html_body)
             
         except Exception as e:
-            print(f"DEBUG: Error sending leave request notification: {str(e)}")
+            logger.error("Error sending leave request notification: %s", e)
             return False
     
     @staticmethod
     def send_leave_status_notification(leave_application, new_status):
         """Send notification to employee when leave status changes"""
         try:
-            from app.models import EmailSettings
-            settings = EmailSettings.get_settings()
-            if not settings.notify_leave_requests:
-                print("DEBUG: Leave request notifications are disabled")
+            if not leave_notifications_enabled():
+                logger.debug("Leave request notifications are disabled")
                 return False
             
             employee_email = leave_application.employee_email
             if not employee_email:
-                print(f"DEBUG: No employee email for leave request {leave_application.reference_code}")
+                logger.warning("No employee email for leave request %s", leave_application.reference_code)
                 return False
             
             status_word = "Approved" if new_status == "approved" else "Disapproved"
@@ -173,48 +433,27 @@ Employee Scheduling System - Automated Notification
             app_url = EmailService.get_app_url()
             my_applications_url = f"{app_url.rstrip('/')}/leave/my-applications"
             
-            comments_text = ""
-            if leave_application.reviewer_comments:
-                comments_text = f"\nComments: {leave_application.reviewer_comments}"
-            
-            body = f"""
-Your Leave Request Has Been {status_word}
-
-Reference Code: {leave_application.reference_code}
-Leave Type: {leave_application.leave_type.value}
-Dates: {leave_application.start_date}
-Status: {status_word}
-Reviewed By: {leave_application.approver_name}
-Review Date: {leave_application.date_reviewed.strftime('%B %d, %Y %I:%M %p') if leave_application.date_reviewed else 'N/A'}{comments_text}
-
-To view your leave application details, please visit:
-{my_applications_url}
-
----
-Employee Scheduling System - Automated Notification
-            """.strip()
-            
-            # Create simple HTML version
-            status_color = "#28a745" if new_status == "approved" else "#dc3545"
-            html_body = f"""
-            <h2 style="color: {status_color};">Your Leave Request Has Been {status_word}</h2>
-            <p><strong>Reference Code:</strong> {leave_application.reference_code}</p>
-            <p><strong>Leave Type:</strong> {leave_application.leave_type.value}</p>
-            <p><strong>Dates:</strong> {leave_application.start_date}</p>
-            <p><strong>Status:</strong> <span style="color: {status_color};">{status_word}</span></p>
-            <p><strong>Reviewed By:</strong> {leave_application.approver_name}</p>
-            <p><strong>Review Date:</strong> {leave_application.date_reviewed.strftime('%B %d, %Y %I:%M %p') if leave_application.date_reviewed else 'N/A'}</p>
-            {f'<p><strong>Comments:</strong> {leave_application.reviewer_comments}</p>' if leave_application.reviewer_comments else ''}
-            
-            <p><a href="{my_applications_url}" style="background: #007bff; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px;">View My Leave Applications</a></p>
-            
-            <p style="font-size: 12px; color: #666;">Employee Scheduling System - Automated Notification</p>
-            """
+            comments = leave_application.reviewer_comments
+            date_reviewed = leave_application.date_reviewed
+            fields = {
+                'status_word': status_word,
+                'status_color': "#28a745" if new_status == "approved" else "#dc3545",
+                'reference_code': leave_application.reference_code,
+                'leave_type': leave_application.leave_type.value,
+                'start_date': leave_application.start_date,
+                'approver_name': leave_application.approver_name,
+                'review_date': date_reviewed.strftime('%B %d, %Y %I:%M %p') if date_reviewed else 'N/A',
+                'comments_text': f"\nComments: {comments}" if comments else "",
+                'comments_html': _LEAVE_STATUS_COMMENTS_HTML.format(comments=comments) if comments else "",
+                'my_applications_url': my_applications_url,
+            }
+            body = _LEAVE_STATUS_BODY_TMPL.format(**fields)
+            html_body = _LEAVE_STATUS_HTML_TMPL.format(**fields)
             
             return EmailService.send_email(employee_email, subject, body, html_body)
             
         except Exception as e:
-            print(f"DEBUG: Error sending leave status notification: {str(e)}")
+            logger.error("Error sending leave status notification: %s", e)
             return False
     
     @staticmethod
@@ -224,31 +463,15 @@ Employee Scheduling System - Automated Notification
             app_url = app_url or EmailService.get_app_url()
             subject = "Test Email from Employee Scheduling System"
             
-            body = f"""
-Test Email from Employee Scheduling System
-
-This is a test email to verify that your email configuration is working correctly.
-
-Application URL: {app_url}
-Sent at: {datetime.now().strftime('%B %d, %Y at %I:%M %p')}
-
-If you received this email, your SMTP settings are configured properly!
-
----
-Employee Scheduling System - Email Configuration Test
-            """.strip()
-            
-            html_body = f"""
-            <h2>Test Email from Employee Scheduling System</h2>
-            <p>This is a test email to verify that your email configuration is working correctly.</p>
-            <p><strong>Application URL:</strong> <a href="{app_url}">{app_url}</a></p>
-            <p><strong>Sent at:</strong> {datetime.now().strftime('%B %d, %Y at %I:%M %p')}</p>
-            <p style="color: #28a745;"><strong>✅ If you received this email, your SMTP settings are configured properly!</strong></p>
-            <p style="font-size: 12px; color: #666;">Employee Scheduling System - Email Configuration Test</p>
-            """
+            fields = {
+                'app_url': app_url,
+                'sent_at': datetime.now().strftime('%B %d, %Y at %I:%M %p'),
+            }
+            body = _TEST_EMAIL_BODY_TMPL.format(**fields)
+            html_body = _TEST_EMAIL_HTML_TMPL.format(**fields)
             
-            return EmailService.send_email(to_email, subject, body, html_body)
+            return EmailService.send_email_sync(to_email, subject, body, html_body)
             
         except Exception as e:
-            print(f"DEBUG: Error sending test email: {str(e)}")
+            logger.error("Error sending test email: %s", e)
             return False
\ No newline at end of file
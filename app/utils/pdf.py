@@ -0,0 +1,52 @@
+"""
+wkhtmltopdf rendering shared by the leave and work extension PDF downloads.
+
+pdfkit resolves the wkhtmltopdf binary (by spawning `which`) every time it is
+called without a configuration, so each PDF cost two process spawns. The
+configuration is resolved once per worker process here, and the number of
+wkhtmltopdf processes a worker runs at once is bounded so a burst of
+downloads queues instead of starting one Qt instance per request thread.
+"""
+
+import functools
+import re
+import threading
+
+import pdfkit
+
+MAX_CONCURRENT_RENDERS = 2
+
+_render_slots = threading.BoundedSemaphore(MAX_CONCURRENT_RENDERS)
+
+
+_CSS_COMMENT = re.compile(r"/\*.*?\*/", re.S)
+_CSS_WHITESPACE = re.compile(r"\s+")
+_CSS_PUNCTUATION = re.compile(r"\s*([;{},>])\s*")
+
+
+def minify_css(css):
+    """Strip comments and insignificant whitespace from a stylesheet"""
+    css = _CSS_COMMENT.sub("", css)
+    css = _CSS_WHITESPACE.sub(" ", css)
+    css = _CSS_PUNCTUATION.sub(r"\1", css)
+    css = css.replace(": ", ":")  # Only after the colon - " :hover" is a descendant selector
+    return css.replace(";}", "}").strip()
+
+
+@functools.lru_cache(maxsize=None)
+def load_stylesheet(path):
+    """Read and minify a PDF stylesheet once per worker process"""
+    with open(path, encoding="utf-8") as f:
+        return minify_css(f.read())
+
+
+@functools.lru_cache(maxsize=None)
+def _configuration():
+    """pdfkit configuration with the wkhtmltopdf path looked up once"""
+    return pdfkit.configuration()
+
+
+def render_pdf(html_content, options):
+    """Render an HTML string to PDF bytes with wkhtmltopdf"""
+    with _render_slots:
+        return pdfkit.from_string(html_content, False, options=options, configuration=_configuration())
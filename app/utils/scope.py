@@ -0,0 +1,34 @@
+"""
+Organizational scope helpers - which users a given user works with.
+
+The section -> unit -> everyone fallback used to be repeated in every
+schedule and export route; routes now build on scoped_user_query() and add
+their own options, ordering or .with_entities(User.id) as needed.
+"""
+
+from app.models import User
+
+
+def roster_scope(user):
+    """Describe `user`'s roster as (scope_key, filter_by criteria).
+    
+    Section members if the user has a section, else unit members, else every
+    user for schedule editors. Anyone else only sees themselves, which is
+    reported with a None scope key.
+    """
+    if user.section_id:
+        return f"s{user.section_id}", {'section_id': user.section_id}
+    if user.unit_id:
+        return f"u{user.unit_id}", {'unit_id': user.unit_id}
+    if user.can_edit_schedule():
+        return 'all', {}
+    return None, {'id': user.id}
+
+
+def scoped_user_query(user, active_only=True):
+    """User query limited to `user`'s roster (see roster_scope)"""
+    scope_key, criteria = roster_scope(user)
+    query = User.query.filter_by(**criteria)
+    if active_only and scope_key is not None:
+        query = query.filter_by(is_active=True)
+    return query
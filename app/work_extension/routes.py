@@ -1,135 +1,156 @@
 # Create new file: app/work_extension/routes.py
-from flask import render_template, request, redirect, url_for, flash, jsonify, make_response
+from flask import render_template, request, redirect, url_for, flash, jsonify, g, send_file, current_app
 from flask_login import login_required, current_user
+from markupsafe import Markup
 from app.work_extension import bp
 from app.models import (User, WorkExtension, WorkExtensionStatus, EmployeeType, 
                        UserRole, db, Shift, ShiftStatus)
-from app.utils.email_service import EmailService
+from app.utils.background import submit_to
+from app.utils.email_service import EmailService, leave_notifications_enabled
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, date, timedelta, time
+import base64
+import functools
+import glob
+import hashlib
+import io
+import mimetypes
 import os
+import tempfile
 from werkzeug.utils import secure_filename
-import pdfkit
+from app.utils.formatting import fmt_mdy, fmt_time, parse_hhmm
+from app.utils.pdf import load_stylesheet, render_pdf
+from sqlalchemy.orm import joinedload, load_only
+
+@bp.app_template_filter('hhmm')
+def hhmm_filter(value):
+    """Format a time as HH:MM, blank when unset (PDF form fields)"""
+    return fmt_time(value)
+
+@bp.app_template_filter('mdy')
+def mdy_filter(value):
+    """Format a date as MM/DD/YYYY, blank when unset (PDF form fields)"""
+    return fmt_mdy(value)
 
 # Replace the approver functions in app/work_extension/routes.py
 
+GLOBAL_ADMIN_EMAIL = 'post_it@gmanetwork.com'
+
+# HH:MM inputs on the request form, named after the WorkExtension columns
+WORK_EXTENSION_TIME_FIELDS = ('shift_start', 'shift_end', 'actual_time_in',
+                              'actual_time_out', 'extended_from', 'extended_to')
+
+def _approver_load_options():
+    """Loader options for approver dropdown rows (name, title, email, approver_scope badge)
+    
+    The org units behind approver_scope are joined in rather than lazy-loaded
+    per row. Built on call because User.department & co. are backrefs that only
+    exist once the mappers are configured.
+    """
+    return (
+        load_only(
+            User.id, User.first_name, User.last_name, User.email, User.job_title,
+            User.role, User.is_active, User.department_id, User.division_id,
+            User.section_id, User.unit_id, User.is_department_approver,
+            User.is_division_approver, User.is_section_approver, User.is_unit_approver
+        ),
+        joinedload(User.department),
+        joinedload(User.division),
+        joinedload(User.section),
+        joinedload(User.unit),
+    )
+
+MY_EXTENSIONS_PER_PAGE = 25
+
+# Columns rendered by the My Work Extensions cards
+_MY_EXTENSIONS_COLUMNS = (
+    WorkExtension.id, WorkExtension.reference_code, WorkExtension.status,
+    WorkExtension.extension_date, WorkExtension.date_filed, WorkExtension.extension_hours,
+    WorkExtension.approver_name, WorkExtension.date_reviewed, WorkExtension.reason,
+    WorkExtension.reviewer_comments
+)
+
+# Columns rendered by the management page's pending/recent tables
+_MANAGEMENT_LIST_COLUMNS = (
+    WorkExtension.id, WorkExtension.reference_code, WorkExtension.employee_name,
+    WorkExtension.employee_section, WorkExtension.extension_date,
+    WorkExtension.extension_hours, WorkExtension.reason, WorkExtension.status,
+    WorkExtension.date_filed, WorkExtension.date_reviewed
+)
+
 def get_user_approver(user):
-    """Get the designated approver for a user (reuse from leave module)"""
-    approver = None
+    """Get the designated approver for a user (reuse from leave module)
     
-    # First, try to find a section approver (but EXCLUDE the user themselves)
+    Priority: section approver, then unit approver, then a MANAGER (not
+    ADMINISTRATOR) in the same section - resolved in a single query.
+    Users never approve themselves. Memoized per request by user id.
+    """
+    cache = g.setdefault('_work_ext_approver', {})
+    if user.id not in cache:
+        cache[user.id] = _find_user_approver(user)
+    return cache[user.id]
+
+def _find_user_approver(user):
+    tiers = []
     if user.section_id:
-        section_approver = User.query.filter(
-            User.section_id == user.section_id,
-            User.is_section_approver == True,
-            User.is_active == True,
-            User.id != user.id  # Don't let users approve themselves
-        ).first()
-        
-        if section_approver:
-            approver = section_approver
+        tiers.append(db.and_(User.section_id == user.section_id, User.is_section_approver == True))
+    if user.unit_id:
+        tiers.append(db.and_(User.unit_id == user.unit_id, User.is_unit_approver == True))
+    if user.section_id:
+        tiers.append(db.and_(User.section_id == user.section_id, User.role == UserRole.MANAGER))
     
-    # If no section approver, try unit approver (but EXCLUDE the user themselves)
-    if not approver and user.unit_id:
-        unit_approver = User.query.filter(
-            User.unit_id == user.unit_id,
-            User.is_unit_approver == True,
-            User.is_active == True,
-            User.id != user.id  # Don't let users approve themselves
-        ).first()
-        
-        if unit_approver:
-            approver = unit_approver
+    if not tiers:
+        return None
     
-    # If still no approver, try to find a manager in the same section (but EXCLUDE the user themselves)
-    if not approver and user.section_id:
-        manager_approver = User.query.filter(
-            User.section_id == user.section_id,
-            User.role == UserRole.MANAGER,  # Only MANAGER, not ADMINISTRATOR
-            User.is_active == True,
-            User.id != user.id  # Don't let users approve themselves
-        ).first()
-        
-        if manager_approver:
-            approver = manager_approver
-    
-    return approver
+    priority = db.case(*[(tier, rank) for rank, tier in enumerate(tiers)], else_=len(tiers))
+    return User.query.options(*_approver_load_options()).filter(
+        db.or_(*tiers),
+        User.is_active == True,
+        User.id != user.id  # Don't let users approve themselves
+    ).order_by(priority).first()
 
 def get_available_approvers_for_user(user):
     """Get all available approvers for a specific user based on their section/unit
-    EXCLUDES administrators who are not part of the same section/unit"""
-    print(f"DEBUG WORK EXT: Finding approvers for user {user.full_name}")
-    print(f"DEBUG WORK EXT: User section_id: {user.section_id}, unit_id: {user.unit_id}")
-    
-    available_approvers = []
+    EXCLUDES administrators who are not part of the same section/unit
     
-    # Get approvers from the same section
+    Memoized per request by user id (form render and submit re-validation).
+    """
+    cache = g.setdefault('_work_ext_available_approvers', {})
+    if user.id not in cache:
+        cache[user.id] = _find_available_approvers(user)
+    return cache[user.id]
+
+def _find_available_approvers(user):
+    # Section/unit approvers, plus managers and (non-global) admins in the same section/unit
+    scopes = []
     if user.section_id:
-        print(f"DEBUG WORK EXT: Searching for section approvers in section {user.section_id}")
-        section_approvers = User.query.filter(
+        scopes.append(db.and_(
             User.section_id == user.section_id,
             db.or_(
                 User.is_section_approver == True,
-                db.and_(
-                    User.role == UserRole.MANAGER,
-                    User.section_id == user.section_id  # Only managers in same section
-                ),
-                db.and_(
-                    User.role == UserRole.ADMINISTRATOR,
-                    User.section_id == user.section_id,  # Only admins in same section
-                    User.email != 'post_it@gmanetwork.com'  # Exclude global admin from section filtering
-                )
-            ),
-            User.is_active == True,
-            User.id != user.id  # Exclude the user themselves
-        ).all()
-        print(f"DEBUG WORK EXT: Found {len(section_approvers)} section approvers: {[a.full_name for a in section_approvers]}")
-        available_approvers.extend(section_approvers)
-    
-    # Get approvers from the same unit (if different from section)
+                User.role == UserRole.MANAGER,
+                db.and_(User.role == UserRole.ADMINISTRATOR, User.email != GLOBAL_ADMIN_EMAIL)
+            )
+        ))
     if user.unit_id:
-        print(f"DEBUG WORK EXT: Searching for unit approvers in unit {user.unit_id}")
-        unit_approvers = User.query.filter(
+        scopes.append(db.and_(
             User.unit_id == user.unit_id,
             db.or_(
                 User.is_unit_approver == True,
-                db.and_(
-                    User.role == UserRole.MANAGER,
-                    User.unit_id == user.unit_id  # Only managers in same unit
-                ),
-                db.and_(
-                    User.role == UserRole.ADMINISTRATOR,
-                    User.unit_id == user.unit_id,  # Only admins in same unit
-                    User.email != 'post_it@gmanetwork.com'  # Exclude global admin from unit filtering
-                )
-            ),
-            User.is_active == True,
-            User.id != user.id  # Exclude the user themselves
-        ).all()
-        print(f"DEBUG WORK EXT: Found {len(unit_approvers)} unit approvers: {[a.full_name for a in unit_approvers]}")
-        
-        # Add unit approvers that aren't already in the list
-        for approver in unit_approvers:
-            if approver not in available_approvers:
-                available_approvers.append(approver)
-    
-    # ALWAYS include the global admin (post_it@gmanetwork.com) as an option
-    global_admin = User.query.filter(
-        User.email == 'post_it@gmanetwork.com',
-        User.role == UserRole.ADMINISTRATOR,
-        User.is_active == True,
-        User.id != user.id
-    ).first()
-    
-    if global_admin and global_admin not in available_approvers:
-        available_approvers.append(global_admin)
-        print(f"DEBUG WORK EXT: Added global admin: {global_admin.full_name}")
+                User.role == UserRole.MANAGER,
+                db.and_(User.role == UserRole.ADMINISTRATOR, User.email != GLOBAL_ADMIN_EMAIL)
+            )
+        ))
     
-    # Remove duplicates and sort by name
-    unique_approvers = list(set(available_approvers))
-    unique_approvers.sort(key=lambda x: x.full_name)
+    # ALWAYS include the global admin as an option
+    scopes.append(db.and_(User.email == GLOBAL_ADMIN_EMAIL, User.role == UserRole.ADMINISTRATOR))
     
-    print(f"DEBUG WORK EXT: Final unique work extension approvers: {[a.full_name for a in unique_approvers]}")
-    return unique_approvers
+    # One query; rows are unique users, so no Python-side dedup is needed
+    return User.query.options(*_approver_load_options()).filter(
+        db.or_(*scopes),
+        User.is_active == True,
+        User.id != user.id  # Exclude the user themselves
+    ).order_by(User.first_name, User.last_name).all()
 
 @bp.route('/')
 @bp.route('/request')
@@ -164,48 +185,38 @@ def submit_work_extension():
         # Employee is always the current user
         employee = current_user
         
+        # Resolve the request proxy once; every field below is read a single time
+        form = request.form
+        
         # Get approver from form
-        approver_id = request.form.get('approver_id')
+        approver_id = form.get('approver_id', type=int)
         if not approver_id:
             flash('No approver selected. Please try again.', 'danger')
             return redirect(url_for('work_extension.request_work_extension'))
         
-        approver = User.query.get(approver_id)
-        if not approver or not approver.can_approve_leaves():
+        # Existence and approval rights checked in the same query
+        approver = User.query.filter(
+            User.id == approver_id,
+            User.is_active == True,
+            User.can_approve_leaves_criteria()
+        ).first()
+        if not approver:
             flash('Selected approver is not valid.', 'danger')
             return redirect(url_for('work_extension.request_work_extension'))
         
         # Validate required fields
-        extension_date_str = request.form.get('extension_date')
-        reason = request.form.get('reason', '').strip()
+        extension_date_str = form.get('extension_date')
+        reason = form.get('reason', '').strip()
         
         if not extension_date_str or not reason:
             flash('Please fill in all required fields.', 'danger')
             return redirect(url_for('work_extension.request_work_extension'))
         
         # Parse dates and times
-        extension_date = datetime.strptime(extension_date_str, '%Y-%m-%d').date()
+        extension_date = date.fromisoformat(extension_date_str)
         
-        # Parse times
-        shift_start = None
-        shift_end = None
-        actual_time_in = None
-        actual_time_out = None
-        extended_from = None
-        extended_to = None
-        
-        if request.form.get('shift_start'):
-            shift_start = datetime.strptime(request.form.get('shift_start'), '%H:%M').time()
-        if request.form.get('shift_end'):
-            shift_end = datetime.strptime(request.form.get('shift_end'), '%H:%M').time()
-        if request.form.get('actual_time_in'):
-            actual_time_in = datetime.strptime(request.form.get('actual_time_in'), '%H:%M').time()
-        if request.form.get('actual_time_out'):
-            actual_time_out = datetime.strptime(request.form.get('actual_time_out'), '%H:%M').time()
-        if request.form.get('extended_from'):
-            extended_from = datetime.strptime(request.form.get('extended_from'), '%H:%M').time()
-        if request.form.get('extended_to'):
-            extended_to = datetime.strptime(request.form.get('extended_to'), '%H:%M').time()
+        # Parse times (blank fields stay None)
+        times = {field: parse_hhmm(form.get(field)) for field in WORK_EXTENSION_TIME_FIELDS}
         
         # Create work extension
         work_ext = WorkExtension(
@@ -213,17 +224,12 @@ def submit_work_extension():
             employee_id=employee.id,
             employee_name=employee.full_name,
             employee_email=employee.email,
-            employee_contact=request.form.get('contact', employee.contact_number),
+            employee_contact=form.get('contact', employee.contact_number),
             employee_section=employee.section.name if employee.section else '',
             employee_signature_path=getattr(employee, 'signature', '') or '',
             
             extension_date=extension_date,
-            shift_start=shift_start,
-            shift_end=shift_end,
-            actual_time_in=actual_time_in,
-            actual_time_out=actual_time_out,
-            extended_from=extended_from,
-            extended_to=extended_to,
+            **times,
             reason=reason,
             
             approver_id=approver.id,
@@ -243,13 +249,13 @@ def submit_work_extension():
         
         # Send email notification to approver
         try:
-            email_sent = send_work_extension_notification(work_ext)
-            if email_sent:
-                flash(f'Work Extension {work_ext.reference_code} submitted successfully! Approver has been notified by email.', 'success')
+            email_queued = send_work_extension_notification(work_ext)
+            if email_queued:
+                flash(f'Work Extension {work_ext.reference_code} submitted successfully! An email notification to the approver has been queued.', 'success')
             else:
-                flash(f'Work Extension {work_ext.reference_code} submitted successfully! (Email notification could not be sent)', 'warning')
+                flash(f'Work Extension {work_ext.reference_code} submitted successfully! (Email notification was not sent)', 'warning')
         except Exception as e:
-            print(f"Email notification error: {str(e)}")
+            current_app.logger.warning("Email notification error: %s", e)
             flash(f'Work Extension {work_ext.reference_code} submitted successfully! (Email notification failed)', 'warning')
         
         return redirect(url_for('work_extension.my_work_extensions'))
@@ -267,9 +273,31 @@ def my_work_extensions():
         flash('Access denied.', 'danger')
         return redirect(url_for('main.dashboard'))
     
-    extensions = WorkExtension.query.filter_by(employee_id=current_user.id)\
-                                  .order_by(WorkExtension.created_at.desc()).all()
-    return render_template('work_extension/my_work_extensions.html', extensions=extensions)
+    page = request.args.get('page', 1, type=int)
+    pagination = WorkExtension.query.filter_by(employee_id=current_user.id)\
+                                  .options(load_only(*_MY_EXTENSIONS_COLUMNS))\
+                                  .order_by(WorkExtension.created_at.desc())\
+                                  .paginate(page=page, per_page=MY_EXTENSIONS_PER_PAGE, error_out=False)
+    
+    # Summary covers every extension, not just this page - aggregated in SQL
+    summary = {'pending': 0, 'approved': 0, 'disapproved': 0, 'approved_hours': 0}
+    status_totals = db.session.query(
+        WorkExtension.status,
+        db.func.count(WorkExtension.id),
+        db.func.sum(WorkExtension.extension_hours)
+    ).filter(WorkExtension.employee_id == current_user.id).group_by(WorkExtension.status)
+    for status, count, hours in status_totals:
+        if status is None:
+            continue
+        summary[status.value] = count
+        if status == WorkExtensionStatus.APPROVED:
+            summary['approved_hours'] = hours or 0
+    summary['total'] = pagination.total
+    
+    return render_template('work_extension/my_work_extensions.html',
+                         extensions=pagination.items,
+                         pagination=pagination,
+                         summary=summary)
 
 @bp.route('/management')
 @login_required
@@ -279,27 +307,40 @@ def work_extension_management():
         flash('You do not have permission to access Work Extension Management.', 'danger')
         return redirect(url_for('main.dashboard'))
     
-    # Get extensions this user can approve
-    approvable_employees = current_user.get_approvable_employees()
-    # Filter to only confidential employees
-    confidential_employees = [emp for emp in approvable_employees 
-                            if emp.can_file_work_extension()]
-    employee_ids = [emp.id for emp in confidential_employees]
+    # Get extensions this user can approve - only confidential employees,
+    # filtered in SQL instead of hydrating every approvable employee
+    confidential_scope = db.and_(
+        current_user.approvable_employees_filter(),
+        User.employee_type.in_(User.WORK_EXTENSION_EMPLOYEE_TYPES)
+    )
+    # Subquery rather than an id list: one statement no matter how many employees
+    employee_ids = db.select(User.id).where(confidential_scope)
     
-    # Get pending and recent extensions
-    pending_extensions = WorkExtension.query\
-        .filter(WorkExtension.employee_id.in_(employee_ids))\
-        .filter_by(status=WorkExtensionStatus.PENDING)\
-        .order_by(WorkExtension.date_filed.asc()).all()
-    
-    recent_extensions = WorkExtension.query\
-        .filter(WorkExtension.employee_id.in_(employee_ids))\
+    # Get pending and recent extensions in one round trip (UNION ALL tagged by bucket)
+    in_scope = WorkExtension.query\
+        .options(load_only(*_MANAGEMENT_LIST_COLUMNS))\
+        .filter(WorkExtension.employee_id.in_(employee_ids))
+    pending_q = in_scope\
+        .filter(WorkExtension.status == WorkExtensionStatus.PENDING)\
+        .add_columns(db.literal('pending').label('bucket'))\
+        .order_by(WorkExtension.date_filed.asc())
+    recent_q = in_scope\
         .filter(WorkExtension.status.in_([WorkExtensionStatus.APPROVED, WorkExtensionStatus.DISAPPROVED]))\
-        .order_by(WorkExtension.date_reviewed.desc()).limit(20).all()
+        .add_columns(db.literal('recent').label('bucket'))\
+        .order_by(WorkExtension.date_reviewed.desc()).limit(20)
+    
+    pending_extensions = []
+    recent_extensions = []
+    for extension, bucket in pending_q.union_all(recent_q):
+        (pending_extensions if bucket == 'pending' else recent_extensions).append(extension)
+    
+    # The outer UNION doesn't promise branch order, so re-sort (already sorted - linear)
+    pending_extensions.sort(key=lambda ext: ext.date_filed)
+    recent_extensions.sort(key=lambda ext: ext.date_reviewed or datetime.min, reverse=True)
     
     stats = {
         'pending_count': len(pending_extensions),
-        'total_confidential_employees': len(confidential_employees),
+        'total_confidential_employees': db.session.query(db.func.count(User.id)).filter(confidential_scope).scalar(),
         'approver_scope': current_user.approver_scope
     }
     
@@ -312,7 +353,7 @@ def work_extension_management():
 @login_required
 def get_work_extension(ext_id):
     """Get work extension details"""
-    extension = WorkExtension.query.get(ext_id)
+    extension = db.session.get(WorkExtension, ext_id)
     if not extension:
         return jsonify({'success': False, 'error': 'Work extension not found'}), 404
     
@@ -332,7 +373,7 @@ def get_work_extension(ext_id):
 def download_work_extension_pdf(ext_id):
     """Download work extension as PDF"""
     try:
-        extension = WorkExtension.query.get(ext_id)
+        extension = db.session.get(WorkExtension, ext_id)
         if not extension:
             return jsonify({'success': False, 'error': 'Work extension not found'}), 404
         
@@ -345,15 +386,11 @@ def download_work_extension_pdf(ext_id):
         # Generate HTML with populated data
         html_content = create_populated_work_extension_html(extension)
         
-        # Convert HTML to PDF using wkhtmltopdf
-        pdf_data = html_to_pdf(html_content)
-        
-        # Create response
-        response = make_response(pdf_data)
-        response.headers['Content-Type'] = 'application/pdf'
-        response.headers['Content-Disposition'] = f'attachment; filename=WorkExtension_{extension.reference_code}.pdf'
+        # Convert HTML to PDF using wkhtmltopdf (or reuse the cached render)
+        pdf_file = open_cached_work_extension_pdf(extension, html_content)
         
-        return response
+        return send_file(pdf_file, mimetype='application/pdf', as_attachment=True,
+                         download_name=f'WorkExtension_{extension.reference_code}.pdf')
         
     except Exception as e:
         return jsonify({'success': False, 'error': f'Error generating PDF: {str(e)}'}), 500
@@ -363,7 +400,7 @@ def download_work_extension_pdf(ext_id):
 def approve_work_extension(ext_id):
     """Approve work extension"""
     try:
-        extension = WorkExtension.query.get(ext_id)
+        extension = db.session.get(WorkExtension, ext_id)
         if not extension:
             return jsonify({'success': False, 'error': 'Work extension not found'}), 404
         
@@ -384,12 +421,13 @@ def approve_work_extension(ext_id):
         extension.reviewer_comments = comments
         
         db.session.commit()
+        prerender_work_extension_pdf(extension.id)
         
         # Send status update email to employee
         try:
             send_work_extension_status_notification(extension, "approved")
         except Exception as e:
-            print(f"Email notification error: {str(e)}")
+            current_app.logger.warning("Email notification error: %s", e)
         
         return jsonify({
             'success': True,
@@ -405,7 +443,7 @@ def approve_work_extension(ext_id):
 def disapprove_work_extension(ext_id):
     """Disapprove work extension"""
     try:
-        extension = WorkExtension.query.get(ext_id)
+        extension = db.session.get(WorkExtension, ext_id)
         if not extension:
             return jsonify({'success': False, 'error': 'Work extension not found'}), 404
         
@@ -429,12 +467,13 @@ def disapprove_work_extension(ext_id):
         extension.reviewer_comments = comments
         
         db.session.commit()
+        prerender_work_extension_pdf(extension.id)
         
         # Send status update email to employee
         try:
             send_work_extension_status_notification(extension, "disapproved")
         except Exception as e:
-            print(f"Email notification error: {str(e)}")
+            current_app.logger.warning("Email notification error: %s", e)
         
         return jsonify({
             'success': True,
@@ -449,23 +488,20 @@ def disapprove_work_extension(ext_id):
 def send_work_extension_notification(work_extension):
     """Send work extension notification to approver"""
     try:
-        # Check if notifications are enabled
-        from app.models import EmailSettings
-        settings = EmailSettings.get_settings()
-        if not settings.notify_leave_requests:  # Reuse leave notification setting
-            print("DEBUG: Leave request notifications are disabled")
+        # Check if notifications are enabled (reuses the leave notification setting, cached)
+        if not leave_notifications_enabled():
+            current_app.logger.debug("Leave request notifications are disabled")
             return False
         
         approver_email = work_extension.approver_email
         if not approver_email:
-            print(f"DEBUG: No approver email for work extension {work_extension.reference_code}")
+            current_app.logger.warning("No approver email for work extension %s", work_extension.reference_code)
             return False
         
         # Create email content
         subject = f"New Work Extension Request - {work_extension.reference_code}"
         
         # Get app URL for links
-        from app.utils.email_service import EmailService
         app_url = EmailService.get_app_url()
         management_url = f"{app_url.rstrip('/')}/work-extension/management"
         
@@ -506,28 +542,25 @@ Employee Scheduling System - Automated Notification
         return EmailService.send_email(approver_email, subject, body, html_body)
         
     except Exception as e:
-        print(f"DEBUG: Error sending work extension notification: {str(e)}")
+        current_app.logger.error("Error sending work extension notification: %s", e)
         return False
 
 def send_work_extension_status_notification(work_extension, new_status):
     """Send notification to employee when work extension status changes"""
     try:
-        from app.models import EmailSettings
-        settings = EmailSettings.get_settings()
-        if not settings.notify_leave_requests:
-            print("DEBUG: Leave request notifications are disabled")
+        if not leave_notifications_enabled():
+            current_app.logger.debug("Leave request notifications are disabled")
             return False
         
         employee_email = work_extension.employee_email
         if not employee_email:
-            print(f"DEBUG: No employee email for work extension {work_extension.reference_code}")
+            current_app.logger.warning("No employee email for work extension %s", work_extension.reference_code)
             return False
         
         status_word = "Approved" if new_status == "approved" else "Disapproved"
         subject = f"Work Extension {status_word} - {work_extension.reference_code}"
         
         # Get app URL for links
-        from app.utils.email_service import EmailService
         app_url = EmailService.get_app_url()
         my_extensions_url = f"{app_url.rstrip('/')}/work-extension/my-work-extensions"
         
@@ -572,476 +605,130 @@ Employee Scheduling System - Automated Notification
         return EmailService.send_email(employee_email, subject, body, html_body)
         
     except Exception as e:
-        print(f"DEBUG: Error sending work extension status notification: {str(e)}")
+        current_app.logger.error("Error sending work extension status notification: %s", e)
         return False
 
 # PDF GENERATION FUNCTIONS
+# wkhtmltopdf options (A6 landscape) - built once rather than on every render
+WORK_EXTENSION_PDF_OPTIONS = {
+    'page-size': 'A6',
+    'orientation': 'landscape',
+    'margin-top': '0.2in',
+    'margin-right': '0.4in', 
+    'margin-bottom': '0.4in',
+    'margin-left': '0.6in',
+    'encoding': "UTF-8",
+    'no-outline': None,
+    'enable-local-file-access': None,
+    'disable-smart-shrinking': None,
+    'print-media-type': None,
+    'quiet': None
+}
+
 def html_to_pdf(html_content):
     """Convert HTML content to PDF using wkhtmltopdf"""
     try:
-        options = {
-            'page-size': 'A6',
-            'orientation': 'landscape',
-            'margin-top': '0.2in',
-            'margin-right': '0.4in', 
-            'margin-bottom': '0.4in',
-            'margin-left': '0.6in',
-            'encoding': "UTF-8",
-            'no-outline': None,
-            'enable-local-file-access': None,
-            'disable-smart-shrinking': None,
-            'print-media-type': None,
-            'quiet': None
-        }
-        
-        return pdfkit.from_string(html_content, False, options=options)
-        
+        return render_pdf(html_content, WORK_EXTENSION_PDF_OPTIONS)
     except Exception as e:
-        print(f"Error converting HTML to PDF: {str(e)}")
+        current_app.logger.error("Error converting HTML to PDF: %s", e)
         raise e
 
+# One thread of its own, so prerenders queue behind each other instead of
+# competing with notification emails on the shared background pool
+_prerender_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='pdf-prerender')
+
+def prerender_work_extension_pdf(ext_id):
+    """Warm the PDF disk cache after an extension is approved or disapproved
+    
+    wkhtmltopdf takes a second or more; rendering right after the review means
+    the later download is normally a cache hit instead of tying up a gunicorn
+    worker. Not done on submit - the review changes the PDF, so that render
+    would always be thrown away.
+    """
+    submit_to(_prerender_executor, _render_work_extension_pdf_job, ext_id)
+
+def _render_work_extension_pdf_job(ext_id):
+    extension = db.session.get(WorkExtension, ext_id)
+    if extension is not None:
+        open_cached_work_extension_pdf(extension, create_populated_work_extension_html(extension)).close()
+
+def open_cached_work_extension_pdf(extension, html_content):
+    """Open the PDF for this exact HTML as a binary file, rendering it with wkhtmltopdf only on a miss
+    
+    Files are keyed by extension id plus a digest of the HTML, so any change
+    that shows up on the form (approval, reviewer, renamed/deleted approver)
+    produces a new file; older renders of the same extension are removed.
+    A hit is returned as an open handle (which outlives a concurrent sweep)
+    and a miss as the freshly rendered bytes, so callers never re-open a path.
+    """
+    cache_dir = os.path.join(current_app.instance_path, 'pdf_cache', 'work_extensions')
+    digest = hashlib.sha256(html_content.encode('utf-8')).hexdigest()[:16]
+    pdf_path = os.path.join(cache_dir, f'{extension.id}-{digest}.pdf')
+    try:
+        return open(pdf_path, 'rb')
+    except FileNotFoundError:
+        pass
+    
+    os.makedirs(cache_dir, exist_ok=True)
+    pdf_data = html_to_pdf(html_content)
+    
+    # Write atomically so a concurrent download never sees a partial file
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp_file:
+            tmp_file.write(pdf_data)
+        os.replace(tmp_path, pdf_path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+    
+    # Only sweep renders older than this one - a newer file belongs to a later change
+    written_ns = os.stat(pdf_path).st_mtime_ns
+    for stale_path in glob.glob(os.path.join(cache_dir, f'{extension.id}-*.pdf')):
+        if stale_path == pdf_path:
+            continue
+        try:
+            if os.stat(stale_path).st_mtime_ns < written_ns:
+                os.remove(stale_path)
+        except OSError:
+            pass
+    
+    return io.BytesIO(pdf_data)
+
 def get_signature_html(signature_path, alt_text="Signature"):
     """Generate HTML for signature image if it exists"""
     if not signature_path:
         return ''
     
-    from flask import current_app
-    import os
-    
     # Use the correct path based on where signatures are actually stored
     signature_file_path = os.path.join(current_app.root_path, 'static', 'uploads', 'signatures', signature_path)
     
-    if os.path.exists(signature_file_path):
-        # Use absolute path for wkhtmltopdf
-        absolute_path = os.path.abspath(signature_file_path)
-        return f'<img src="file://{absolute_path}" alt="{alt_text}" style="max-height: 40px; max-width: 200px;">'
-    else:
+    try:
+        mtime_ns = os.stat(signature_file_path).st_mtime_ns
+    except OSError:
         return ''
+    
+    # Inline the image so wkhtmltopdf doesn't read the file on every render
+    data_uri = _signature_data_uri(signature_file_path, mtime_ns)
+    return f'<img src="{data_uri}" alt="{alt_text}" style="max-height: 40px; max-width: 200px;">'
+
+@functools.lru_cache(maxsize=512)
+def _signature_data_uri(signature_file_path, mtime_ns):
+    """base64 data: URI for a signature file - cached per (path, mtime), so a replaced file is re-read"""
+    mime_type = mimetypes.guess_type(signature_file_path)[0] or 'image/png'
+    with open(signature_file_path, 'rb') as signature_file:
+        encoded = base64.b64encode(signature_file.read()).decode('ascii')
+    return f'data:{mime_type};base64,{encoded}'
 
 def create_populated_work_extension_html(extension):
     """Create HTML content with populated Work Extension form data optimized for A5 landscape"""
-    
-    # Get signature images
-    employee_signature = get_signature_html(extension.employee_signature_path, "Employee Signature")
-    approver_signature = get_signature_html(extension.approver_signature_path, "Approver Signature")
-    
-    # Format dates and times
-    formatted_extension_date = extension.extension_date.strftime('%m/%d/%Y') if extension.extension_date else ''
-    formatted_date_filed = extension.date_filed.strftime('%m/%d/%Y') if extension.date_filed else ''
-    
-    shift_start_str = extension.shift_start.strftime('%H:%M') if extension.shift_start else ''
-    shift_end_str = extension.shift_end.strftime('%H:%M') if extension.shift_end else ''
-    actual_time_in_str = extension.actual_time_in.strftime('%H:%M') if extension.actual_time_in else ''
-    actual_time_out_str = extension.actual_time_out.strftime('%H:%M') if extension.actual_time_out else ''
-    extended_from_str = extension.extended_from.strftime('%H:%M') if extension.extended_from else ''
-    extended_to_str = extension.extended_to.strftime('%H:%M') if extension.extended_to else ''
-    
-    # Split reason into multiple lines for the form
-    reason_lines = extension.reason.split('\n') if extension.reason else ['']
-    reason_text = extension.reason[:400] if extension.reason else ''  # Reduced to fit better
-
-    html_template = f"""
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Work Extension Form</title>
-        <style>
-            body {{
-                font-family: Arial, sans-serif;
-                margin: 0;
-                padding: 0;
-                background-color: white;
-                font-size: 12px;
-                line-height: 1.1;
-            }}
-            
-            .form-container {{
-                width: 148mm;  /* A5 landscape width */
-                height: 105mm;  /* A5 landscape height */
-                margin: 0 auto;
-                padding: 8mm 6mm;  /* Reduced padding significantly */
-                box-sizing: border-box;
-                position: relative;
-            }}
-            
-            .title {{
-                font-size: 14px;
-                font-weight: bold;
-                text-decoration: underline;
-                margin-bottom: 8mm;  /* Reduced from 80px */
-                letter-spacing: 0.5px;
-                text-align: center;
-            }}
-            
-            .basic-info {{
-                margin-bottom: 4mm;  /* Reduced from 40px */
-            }}
-            
-            .name-line {{
-                margin-bottom: 3mm;  /* Reduced from 20px */
-                display: flex;
-                align-items: baseline;
-            }}
-            
-            .section-date-line {{
-                display: flex;
-                align-items: baseline;
-                margin-bottom: 4mm;  /* Reduced from 40px */
-            }}
-            
-            .name-line label,
-            .section-date-line label {{
-                font-weight: bold;
-                margin-right: 3px;
-                font-size: 11px;
-            }}
-            
-            .underline {{
-                border-bottom: 1px solid #000;
-                flex: 1;
-                height: 14px;  /* Reduced height */
-                margin-left: 3px;
-                margin-right: 3px;
-                position: relative;
-                padding-left: 3px;
-                font-size: 11px;
-                display: flex;
-                align-items: flex-end;
-            }}
-            
-            .underline-section {{
-                border-bottom: 1px solid #000;
-                width: 60mm;  /* Adjusted for A5 */
-                height: 14px;
-                margin-left: 3px;
-                margin-right: 5mm;
-                position: relative;
-                padding-left: 3px;
-                font-size: 11px;
-                display: flex;
-                align-items: flex-end;
-            }}
-            
-            .underline-date {{
-                border-bottom: 1px solid #000;
-                width: 40mm;  /* Adjusted for A5 */
-                height: 14px;
-                margin-left: 3px;
-                position: relative;
-                padding-left: 3px;
-                font-size: 11px;
-                display: flex;
-                align-items: flex-end;
-            }}
-            
-            .main-content {{
-                display: flex;
-                border: 2px solid #000;
-                margin-bottom: 6mm;  /* Reduced from 60px */
-                height: 45mm;  /* Fixed height for main content */
-            }}
-            
-            .left-section {{
-                width: 50%;
-                padding: 3mm;  /* Reduced padding */
-                border-right: 1px solid #000;
-                box-sizing: border-box;
-            }}
-            
-            .right-section {{
-                width: 50%;
-                padding: 3mm;  /* Reduced padding */
-                box-sizing: border-box;
-            }}
-            
-            .left-section .field {{
-                margin-bottom: 2.5mm;  /* Reduced spacing */
-                display: flex;
-                align-items: baseline;
-            }}
-            
-            .left-section .field label {{
-                font-weight: bold;
-                margin-right: 3px;
-                white-space: nowrap;
-                font-size: 10px;
-            }}
-            
-            .field-underline {{
-                border-bottom: 1px solid #000;
-                flex: 1;
-                height: 12px;  /* Reduced height */
-                margin-left: 3px;
-                position: relative;
-                padding-left: 3px;
-                font-size: 10px;
-                display: flex;
-                align-items: flex-end;
-            }}
-            
-            .shift-schedule {{
-                display: flex;
-                align-items: baseline;
-                margin-bottom: 2.5mm;
-            }}
-            
-            .shift-schedule label {{
-                font-weight: bold;
-                margin-right: 3px;
-                font-size: 10px;
-            }}
-            
-            .shift-from {{
-                border-bottom: 1px solid #000;
-                width: 15mm;  /* Adjusted for A5 */
-                height: 12px;
-                margin: 0 3px;
-                position: relative;
-                padding-left: 2px;
-                font-size: 10px;
-                display: flex;
-                align-items: flex-end;
-            }}
-            
-            .shift-to {{
-                border-bottom: 1px solid #000;
-                width: 15mm;  /* Adjusted for A5 */
-                height: 12px;
-                margin: 0 3px;
-                position: relative;
-                padding-left: 2px;
-                font-size: 10px;
-                display: flex;
-                align-items: flex-end;
-            }}
-            
-            .time-in-out {{
-                display: flex;
-                align-items: baseline;
-                margin-bottom: 3mm;  /* Reduced spacing */
-            }}
-            
-            .time-in-out label {{
-                font-weight: bold;
-                margin-right: 3px;
-                font-size: 10px;
-            }}
-            
-            .time-in {{
-                border-bottom: 1px solid #000;
-                width: 18mm;  /* Adjusted for A5 */
-                height: 12px;
-                margin: 0 3px 0 3px;
-                position: relative;
-                padding-left: 2px;
-                font-size: 10px;
-                display: flex;
-                align-items: flex-end;
-            }}
-            
-            .time-out {{
-                border-bottom: 1px solid #000;
-                width: 18mm;  /* Adjusted for A5 */
-                height: 12px;
-                margin: 0 3px;
-                position: relative;
-                padding-left: 2px;
-                font-size: 10px;
-                display: flex;
-                align-items: flex-end;
-            }}
-            
-            .extended-time-section {{
-                margin-top: 1mm;  /* Reduced spacing */
-            }}
-            
-            .extended-time-title {{
-                font-weight: bold;
-                margin-bottom: 2mm;  /* Reduced spacing */
-                font-size: 10px;
-            }}
-            
-            .extended-time-fields {{
-                display: flex;
-                align-items: baseline;
-            }}
-            
-            .extended-time-fields label {{
-                font-weight: bold;
-                margin-right: 3px;
-                font-size: 10px;
-            }}
-            
-            .extended-from {{
-                border-bottom: 1px solid #000;
-                width: 22mm;  /* Adjusted for A5 */
-                height: 12px;
-                margin: 0 3px 0 3px;
-                position: relative;
-                padding-left: 2px;
-                font-size: 10px;
-                display: flex;
-                align-items: flex-end;
-            }}
-            
-            .extended-to {{
-                border-bottom: 1px solid #000;
-                width: 22mm;  /* Adjusted for A5 */
-                height: 12px;
-                margin: 0 3px;
-                position: relative;
-                padding-left: 2px;
-                font-size: 10px;
-                display: flex;
-                align-items: flex-end;
-            }}
-            
-            .right-section h3 {{
-                font-weight: bold;
-                font-size: 11px;
-                margin: 0 0 2mm 0;  /* Reduced margin */
-            }}
-            
-            .reason-content {{
-                width: 100%;
-                height: 35mm;  /* Fixed height for reason box */
-                font-size: 10px;
-                line-height: 1.2;
-                padding: 2mm;
-                word-wrap: break-word;
-                overflow: hidden;
-                box-sizing: border-box;
-            }}
-            
-            .signatures {{
-                display: flex;
-                justify-content: space-between;
-                margin-top: 4mm;  /* Reduced from 40px */
-                height: 20mm;  /* Fixed height for signatures */
-            }}
-            
-            .signature-block {{
-                text-align: left;
-                width: 30%;
-            }}
-            
-            .signature-title {{
-                font-weight: bold;
-                margin-bottom: 3mm;  /* Reduced spacing */
-                font-size: 10px;
-            }}
-            
-            .signature-line {{
-                border-bottom: 1px solid #000;
-                height: 8mm;  /* Reduced signature line height */
-                margin-bottom: 1mm;
-                width: 35mm;  /* Adjusted for A5 */
-                display: flex;
-                align-items: flex-end;
-                padding-left: 2px;
-            }}
-            
-            .signature-label {{
-                font-weight: normal;
-                font-size: 9px;  /* Smaller label text */
-                line-height: 1;
-            }}
-            
-            @media print {{
-                body {{
-                    margin: 0;
-                    padding: 0;
-                }}
-                
-                .form-container {{
-                    margin: 0;
-                    padding: 8mm 6mm;
-                }}
-            }}
-        </style>
-    </head>
-    <body>
-        <div class="form-container">
-            <div class="title">WORK EXTENSION FORM</div>
-            
-            <div class="basic-info">
-                <div class="name-line">
-                    <label>Name:</label>
-                    <div class="underline">{extension.employee_name}</div>
-                </div>
-                
-                <div class="section-date-line">
-                    <label>Section:</label>
-                    <div class="underline-section">{extension.employee_section}</div>
-                    <label>Date Filed:</label>
-                    <div class="underline-date">{formatted_date_filed}</div>
-                </div>
-            </div>
-            
-            <div class="main-content">
-                <div class="left-section">
-                    <div class="field">
-                        <label>Date of Extended Work:</label>
-                        <div class="field-underline">{formatted_extension_date}</div>
-                    </div>
-                    
-                    <div class="shift-schedule">
-                        <label>Shift Schedule: From</label>
-                        <div class="shift-from">{shift_start_str}</div>
-                        <label>To</label>
-                        <div class="shift-to">{shift_end_str}</div>
-                    </div>
-                    
-                    <div class="time-in-out">
-                        <label>Time In:</label>
-                        <div class="time-in">{actual_time_in_str}</div>
-                        <label>Time Out:</label>
-                        <div class="time-out">{actual_time_out_str}</div>
-                    </div>
-                    
-                    <div class="extended-time-section">
-                        <div class="extended-time-title">Extended Time:</div>
-                        <div class="extended-time-fields">
-                            <label>From:</label>
-                            <div class="extended-from">{extended_from_str}</div>
-                            <label>To:</label>
-                            <div class="extended-to">{extended_to_str}</div>
-                        </div>
-                    </div>
-                </div>
-                
-                <div class="right-section">
-                    <h3>Reason/s for the need to extended work hours:</h3>
-                    <div class="reason-content">
-                        {reason_text}
-                    </div>
-                </div>
-            </div>
-            
-            <div class="signatures">
-                <div class="signature-block">
-                    <div class="signature-title">Prepared by:</div>
-                    <div class="signature-line">{employee_signature if employee_signature else extension.employee_name}</div>
-                    <div class="signature-label">Employee's Name & Signature</div>
-                </div>
-                
-                <div class="signature-block">
-                    <div class="signature-title">Endorsed by:</div>
-                    <div class="signature-line">{approver_signature if approver_signature else extension.approver_name}</div>
-                    <div class="signature-label">Unit Head/Section Head</div>
-                </div>
-                
-                <div class="signature-block">
-                    <div class="signature-title">Approved by:</div>
-                    <div class="signature-line"></div>
-                    <div class="signature-label">First VP or VP Post Production</div>
-                </div>
-            </div>
-        </div>
-    </body>
-    </html>
-    """
-    
-    return html_template
+    # Signature <img> tags are built here; everything else is escaped by the template.
+    # Fallbacks are resolved up front so the template only substitutes values -
+    # an empty Markup is falsy, so a missing signature falls back to the name.
+    return render_template(
+        'work_extension/pdf.html',
+        extension=extension,
+        pdf_css=Markup(load_stylesheet(os.path.join(current_app.static_folder, 'css', 'work_extension_pdf.css'))),
+        employee_signature_or_name=Markup(get_signature_html(extension.employee_signature_path, "Employee Signature")) or extension.employee_name,
+        approver_signature_or_name=Markup(get_signature_html(extension.approver_signature_path, "Approver Signature")) or extension.approver_name
+    )
@@ -1,15 +1,75 @@
+import functools
 import os
+import secrets
 from datetime import timedelta
 
+SECRETS_DIR = os.environ.get('SECRETS_DIR') or '/run/secrets'
+
+# Every gunicorn worker has its own SQLAlchemy pool, so the per-worker limits
+# are derived from Postgres max_connections and the worker count
+DB_MAX_CONNECTIONS = int(os.environ.get('DB_MAX_CONNECTIONS') or 100)
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY') or 4)
+DB_RESERVED_CONNECTIONS = 10  # flask deploy, pg_dump backups, psql
+
+def _pool_limits(max_connections, workers):
+    """(pool_size, max_overflow) so workers * (pool_size + max_overflow) fits max_connections"""
+    per_worker = max(2, (max_connections - DB_RESERVED_CONNECTIONS) // max(workers, 1))
+    return per_worker // 2, per_worker - per_worker // 2
+
+_POOL_SIZE, _MAX_OVERFLOW = _pool_limits(DB_MAX_CONNECTIONS, WEB_CONCURRENCY)
+
+@functools.lru_cache(maxsize=None)
+def _get_secret(name):
+    """Read a secret from <NAME>_FILE, the secrets mount, or the environment"""
+    path = os.environ.get(f'{name}_FILE') or os.path.join(SECRETS_DIR, name.lower())
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return os.environ.get(name)
+
+def _build_id():
+    """BUILD_ID from the environment, else the stamp the Dockerfile writes at build time"""
+    if os.environ.get('BUILD_ID'):
+        return os.environ['BUILD_ID']
+    try:
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'BUILD_ID')) as f:
+            return f.read().strip()
+    except OSError:
+        return 'dev'
+
+def _instance_secret_key(instance_path):
+    """Read instance/dev_secret_key, creating it once if it doesn't exist yet"""
+    path = os.path.join(instance_path, 'dev_secret_key')
+    if not os.path.exists(path):
+        os.makedirs(instance_path, exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}'
+        with os.fdopen(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w') as f:
+            f.write(secrets.token_hex(32))
+        try:
+            # link() fails if another worker won the race - everyone then reads its key
+            os.link(tmp_path, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp_path)
+    with open(path) as f:
+        return f.read().strip()
+
 class Config:
-    SECRET_KEY = os.environ.get('SECRET_KEY') or '5dJcmv1vX4mSQEQh6RSXlccV2jukwLiW'
-    
-    # PostgreSQL Configuration
-    DATABASE_URL = os.environ.get('DATABASE_URL') or \
-        'postgresql://postgres:d7tm3YJJJ7RHVgovPtFzwhK4TsrSbOpT@db:5432/scheduling_db'
-    SQLALCHEMY_DATABASE_URI = DATABASE_URL
+    # SECRET_KEY and the database URL are resolved in create_app (see
+    # secret_key/database_url) so they are never baked into source
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Connection pool tuning - sized per worker (see _pool_limits); 4 workers
+    # against the default max_connections of 100 get 11 + 11 each
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': _POOL_SIZE,
+        'max_overflow': _MAX_OVERFLOW,
+        'pool_pre_ping': True,  # Drop stale connections instead of failing the first query
+        'pool_recycle': 1800
+    }
+    
     # Session configuration
     PERMANENT_SESSION_LIFETIME = timedelta(hours=24)
     
@@ -26,20 +86,74 @@ class Config:
     MAIL_PASSWORD = None
     MAIL_DEFAULT_SENDER = None
     
+    # SMTP connection pool - 0 disables pooling (one session per email)
+    EMAIL_POOL_SIZE = int(os.environ.get('EMAIL_POOL_SIZE') or 0)
+    EMAIL_POOL_MAX_MESSAGES = int(os.environ.get('EMAIL_POOL_MAX_MESSAGES') or 100)  # Recycle after N sends
+    EMAIL_POOL_IDLE_TIMEOUT = int(os.environ.get('EMAIL_POOL_IDLE_TIMEOUT') or 60)  # Seconds
+    
+    # Response cache - SimpleCache is per-process; set CACHE_TYPE=RedisCache
+    # and CACHE_REDIS_URL to share entries between gunicorn workers
+    CACHE_TYPE = os.environ.get('CACHE_TYPE') or 'SimpleCache'
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL')
+    CACHE_DEFAULT_TIMEOUT = 300
+    
     # Pagination
     SHIFTS_PER_PAGE = 20
+    
+    # Identifies the deployed code - part of page ETags so new markup isn't served from a 304
+    BUILD_ID = _build_id()
+    
+    @classmethod
+    def secret_key(cls, instance_path=None):
+        return _get_secret('SECRET_KEY')
+    
+    @classmethod
+    def database_url(cls):
+        return _get_secret('DATABASE_URL')
 
 class DevelopmentConfig(Config):
     DEBUG = True
+    
+    @classmethod
+    def secret_key(cls, instance_path=None):
+        # Generated key so a bare checkout still starts - kept in the instance
+        # folder so every worker process (and restarts) share the same key
+        key = super().secret_key()
+        if key or not instance_path:
+            return key
+        return _instance_secret_key(instance_path)
 
 class ProductionConfig(Config):
     DEBUG = False
-    # Production PostgreSQL URL
-    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
-        'postgresql://postgres:d7tm3YJJJ7RHVgovPtFzwhK4TsrSbOpT@db:5432/scheduling_db'
+    # SQLALCHEMY_DATABASE_URI is set in create_app from Config.database_url()
+    
+    # Server-side cap so a runaway query can't hold a pooled connection
+    # indefinitely (DB_STATEMENT_TIMEOUT_MS=0 disables; backups use pg_dump)
+    DB_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS') or 30000)
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        **Config.SQLALCHEMY_ENGINE_OPTIONS,
+        'connect_args': {'options': f'-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}'}
+    }
 
 config = {
     'development': DevelopmentConfig,
     'production': ProductionConfig,
     'default': DevelopmentConfig
 }
+
+def get_config(name=None):
+    """Config class for name, falling back to FLASK_CONFIG, FLASK_ENV and then 'default'
+    
+    FLASK_ENV is what the Dockerfile and docker-compose.yml set, so a
+    production container gets ProductionConfig without extra settings. It is
+    only used when it names one of our configs (Flask itself accepts other
+    values); an unknown explicit name or FLASK_CONFIG is an error.
+    """
+    flask_env = os.environ.get('FLASK_ENV')
+    if flask_env not in config:
+        flask_env = None
+    key = name or os.environ.get('FLASK_CONFIG') or flask_env or 'default'
+    config_class = config.get(key)
+    if config_class is None:
+        raise ValueError(f"Unknown config {key!r}; expected one of: {', '.join(sorted(config))}")
+    return config_class
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Migration script to enforce unique shift sequences per employee and day
+(uq_shift_emp_date_seq on shifts (employee_id, date, sequence)).
+Existing duplicate rows are renumbered after the day's highest sequence
+before the constraint is added, so no shifts are deleted.
+Usage: python fix_shift_sequence_unique.py <host> <port> <database> <username> <password>
+"""
+
+import sys
+from contextlib import closing
+import psycopg2
+from psycopg2 import errors
+
+# Errors that mean a command was already applied (or has nothing to act on)
+TOLERATED_ERRORS = (
+    errors.UndefinedObject,
+    errors.UndefinedTable,
+    errors.DuplicateObject,
+    errors.DuplicateTable,
+)
+
+# Every row after the first of an (employee_id, date, sequence) group moves to
+# max(sequence) of that day + 1, + 2, ... in id order
+DEDUPE_SQL = """
+    WITH duplicates AS (
+        SELECT id, employee_id, date,
+               ROW_NUMBER() OVER (PARTITION BY employee_id, date, sequence ORDER BY id) AS copy_number
+        FROM shifts
+    ),
+    moved AS (
+        SELECT id, employee_id, date,
+               ROW_NUMBER() OVER (PARTITION BY employee_id, date ORDER BY id) AS offset_number
+        FROM duplicates
+        WHERE copy_number > 1
+    ),
+    day_max AS (
+        SELECT employee_id, date, MAX(sequence) AS max_sequence
+        FROM shifts
+        GROUP BY employee_id, date
+    )
+    UPDATE shifts
+    SET sequence = day_max.max_sequence + moved.offset_number
+    FROM moved
+    JOIN day_max ON day_max.employee_id = moved.employee_id AND day_max.date = moved.date
+    WHERE shifts.id = moved.id;
+"""
+
+def run_migration(host, port, database, username, password):
+    """Renumber duplicate shift sequences and add uq_shift_emp_date_seq"""
+    
+    # Migration SQL commands (after the dedupe)
+    migration_commands = [
+        "ALTER TABLE shifts ADD CONSTRAINT uq_shift_emp_date_seq UNIQUE (employee_id, date, sequence);",
+        # The constraint's unique index replaces the old plain index on the same columns
+        "DROP INDEX IF EXISTS idx_shifts_employee_date_sequence;"
+    ]
+    
+    try:
+        # Connect to database
+        print(f"Connecting to database {database} on {host}:{port}...")
+        # closing() releases the connection and "with conn" commits, or rolls back
+        # if anything below raises, so the dedupe and constraint land together
+        with closing(psycopg2.connect(
+            host=host,
+            port=port,
+            database=database,
+            user=username,
+            password=password
+        )) as conn, conn, conn.cursor() as cursor:
+            # Block concurrent shift writes so no new duplicate appears between
+            # the dedupe and the constraint
+            cursor.execute("LOCK TABLE shifts IN SHARE ROW EXCLUSIVE MODE;")
+            
+            print("Renumbering duplicate shift sequences...")
+            cursor.execute(DEDUPE_SQL)
+            print(f"✓ {cursor.rowcount} duplicate shift(s) renumbered")
+            
+            print("Running migration commands...")
+            
+            for i, command in enumerate(migration_commands, 1):
+                print(f"Executing command {i}/{len(migration_commands)}: {command[:50]}...")
+                try:
+                    cursor.execute(f"SAVEPOINT migration_step; {command} RELEASE SAVEPOINT migration_step;")
+                    print(f"✓ Command {i} executed successfully")
+                except TOLERATED_ERRORS as e:
+                    cursor.execute("ROLLBACK TO SAVEPOINT migration_step;")
+                    print(f"✗ Error in command {i}: {e}")
+                    print("  (This might be expected - continuing...)")
+                except psycopg2.Error as e:
+                    print(f"✗ Error in command {i}: {e}")
+                    raise
+            
+            # Verify the change
+            print("\nVerifying migration...")
+            cursor.execute("""
+                SELECT 1
+                FROM pg_constraint
+                WHERE conname = 'uq_shift_emp_date_seq'
+            """)
+            
+            if cursor.fetchone():
+                print("✓ Migration successful: uq_shift_emp_date_seq is in place")
+            else:
+                print("✗ Migration verification failed")
+        
+        print("\nMigration completed successfully!")
+        return True
+    
+    except psycopg2.Error as e:
+        print(f"Database error: {e}")
+        return False
+    except Exception as e:
+        print(f"Unexpected error: {e}")
+        return False
+
+if __name__ == "__main__":
+    if len(sys.argv) != 6:
+        print("Usage: python fix_shift_sequence_unique.py <host> <port> <database> <username> <password>")
+        print("Example: python fix_shift_sequence_unique.py db 5432 scheduling_db postgres postgres")
+        sys.exit(1)
+    
+    host = sys.argv[1]
+    port = sys.argv[2]
+    database = sys.argv[3]
+    username = sys.argv[4]
+    password = sys.argv[5]
+    
+    success = run_migration(host, port, database, username, password)
+    sys.exit(0 if success else 1)
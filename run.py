@@ -1,11 +1,10 @@
 #!/usr/bin/env python3
-import os
 from app import create_app
 from app.models import db, User, Section, Unit, Shift, UserRole
 from flask_migrate import upgrade
 from sqlalchemy.exc import IntegrityError
 
-app = create_app(os.getenv('FLASK_CONFIG') or 'default')
+app = create_app()
 
 @app.shell_context_processor
 def make_shell_context():
@@ -5,8 +5,18 @@ Usage: python fix_approver_null.py <host> <port> <database> <username> <password
 """
 
 import sys
+from contextlib import closing
 import psycopg2
-from psycopg2 import sql
+from psycopg2 import errors, sql
+
+# Errors that mean a command was already applied (or has nothing to act on)
+TOLERATED_ERRORS = (
+    errors.UndefinedObject,
+    errors.UndefinedTable,
+    errors.UndefinedColumn,
+    errors.DuplicateObject,
+    errors.DuplicateTable,
+)
 
 def run_migration(host, port, database, username, password):
     """Execute the migration to allow NULL approver_id"""
@@ -21,50 +31,49 @@ def run_migration(host, port, database, username, password):
     try:
         # Connect to database
         print(f"Connecting to database {database} on {host}:{port}...")
-        conn = psycopg2.connect(
+        # closing() releases the connection and "with conn" commits, or rolls back
+        # if anything below raises, so no manual cleanup is needed on any path
+        with closing(psycopg2.connect(
             host=host,
             port=port,
             database=database,
             user=username,
             password=password
-        )
-        
-        # Enable autocommit for DDL operations
-        conn.autocommit = True
-        cursor = conn.cursor()
-        
-        print("Running migration commands...")
-        
-        for i, command in enumerate(migration_commands, 1):
-            print(f"Executing command {i}/{len(migration_commands)}: {command[:50]}...")
-            try:
-                cursor.execute(command)
-                print(f"✓ Command {i} executed successfully")
-            except psycopg2.Error as e:
-                print(f"✗ Error in command {i}: {e}")
-                if "does not exist" in str(e) or "already exists" in str(e):
+        )) as conn, conn, conn.cursor() as cursor:
+            # Run every command in one transaction so the migration is all-or-nothing;
+            # each command gets its own savepoint so an expected failure only undoes
+            # that command. The savepoint is sent in the same round trip as the command.
+            
+            print("Running migration commands...")
+            
+            for i, command in enumerate(migration_commands, 1):
+                print(f"Executing command {i}/{len(migration_commands)}: {command[:50]}...")
+                try:
+                    cursor.execute(f"SAVEPOINT migration_step; {command} RELEASE SAVEPOINT migration_step;")
+                    print(f"✓ Command {i} executed successfully")
+                except TOLERATED_ERRORS as e:
+                    cursor.execute("ROLLBACK TO SAVEPOINT migration_step;")
+                    print(f"✗ Error in command {i}: {e}")
                     print("  (This might be expected - continuing...)")
-                else:
+                except psycopg2.Error as e:
+                    print(f"✗ Error in command {i}: {e}")
                     raise
-        
-        # Verify the change
-        print("\nVerifying migration...")
-        cursor.execute("""
-            SELECT column_name, is_nullable 
-            FROM information_schema.columns 
-            WHERE table_name = 'leave_applications' 
-            AND column_name = 'approver_id'
-        """)
-        
-        result = cursor.fetchone()
-        if result and result[1] == 'YES':
-            print("✓ Migration successful: approver_id now allows NULL values")
-        else:
-            print("✗ Migration verification failed")
             
-        cursor.close()
-        conn.close()
-        
+            # Verify the change
+            print("\nVerifying migration...")
+            cursor.execute("""
+                SELECT column_name, is_nullable 
+                FROM information_schema.columns 
+                WHERE table_name = 'leave_applications' 
+                AND column_name = 'approver_id'
+            """)
+            
+            result = cursor.fetchone()
+            if result and result[1] == 'YES':
+                print("✓ Migration successful: approver_id now allows NULL values")
+            else:
+                print("✗ Migration verification failed")
+            
         print("\nMigration completed successfully!")
         return True
         